@@ -0,0 +1,117 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from database import InventoryDatabase
+from records import Material
+
+def create_inventory(db_path, rows, seed=42):
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    
+    db = InventoryDatabase(db_path)
+    rng = random.Random(seed)
+    materials = [
+        {
+            'name': f"Scrap {i}",
+            'brand': rng.choice(["Crafty", "Redwood", "Oakline", "Acme"]),
+            'material_type': rng.choice(["Paper", "Fabric", "Foam", "Wood", "Metal"]),
+            'width': round(rng.uniform(1, 200), 1),
+            'height': round(rng.uniform(1, 200), 1),
+            'depth': round(rng.uniform(0, 20), 1),
+            'quantity': rng.randint(1, 10),
+            'color': rng.choice(["Red", "Blue", "White", "Black"]),
+        }
+        for i in range(rows)
+    ]
+    db.add_materials_bulk(materials, chunk_size=5000)
+    db.conn.execute("ANALYZE")
+    return db
+
+def time_call(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - start) / repeat, result
+
+def bench_dimension_search(rows, repeat):
+    db_path = os.path.join(tempfile.gettempdir(), "bench_dimensions.db")
+    print(f"Creating {rows} synthetic materials...")
+    create_inventory(db_path, rows).close()
+    db = InventoryDatabase(db_path)
+    
+    query = dict(min_width=20, max_width=40, min_height=30, max_height=60)
+    
+    def match_ids():
+        joins, where, params = db._material_filters(**query)
+        return db.conn.execute(f"SELECT m.id FROM materials m{joins} WHERE {where}", params).fetchall()
+    
+    db.rtree_enabled = False
+    scan_time, scan_result = time_call(lambda: db.search_materials(**query), repeat)
+    scan_match_time, _ = time_call(match_ids, repeat)
+    
+    db.rtree_enabled = True
+    rtree_time, rtree_result = time_call(lambda: db.search_materials(**query), repeat)
+    rtree_match_time, _ = time_call(match_ids, repeat)
+    
+    assert [m['id'] for m in scan_result] == [m['id'] for m in rtree_result], "Results should match"
+    
+    print(f"Width 20-40, height 30-60: {len(rtree_result)} matches")
+    print("   search_materials():")
+    print(f"      Row-by-row filter: {scan_time * 1000:.1f} ms")
+    print(f"      R*Tree index:      {rtree_time * 1000:.1f} ms")
+    print(f"      Speedup:           {scan_time / rtree_time:.1f}x")
+    print("   Matching ids only:")
+    print(f"      Row-by-row filter: {scan_match_time * 1000:.1f} ms")
+    print(f"      R*Tree index:      {rtree_match_time * 1000:.1f} ms")
+    print(f"      Speedup:           {scan_match_time / rtree_match_time:.1f}x")
+    
+    db.close()
+    os.remove(db_path)
+
+def bench_row_objects(rows, repeat):
+    db_path = os.path.join(tempfile.gettempdir(), "bench_records.db")
+    print(f"Creating {rows} synthetic materials...")
+    create_inventory(db_path, rows).close()
+    
+    print("Listing all materials:")
+    for row_factory in ("dict", "record"):
+        db = InventoryDatabase(db_path, row_factory=row_factory)
+        elapsed, materials = time_call(db.get_materials, repeat)
+        del materials
+        cursor = db.conn.execute("SELECT * FROM materials")
+        columns = [column[0] for column in cursor.description]
+        raw_rows = cursor.fetchall()
+        build_time, _ = time_call(lambda: db._convert_rows(raw_rows, columns, Material), repeat)
+        del raw_rows
+        
+        tracemalloc.start()
+        materials = db.get_materials()
+        held, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        
+        print(f"   {row_factory:>6}: {elapsed:.2f} s, {build_time:.2f} s building rows, {held / len(materials):.0f} bytes/row, "
+              f"{held / 1024 / 1024:.0f} MB held")
+        del materials
+        db.close()
+    
+    os.remove(db_path)
+
+BENCHMARKS = {
+    'dimensions': bench_dimension_search,
+    'records': bench_row_objects,
+}
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrap Inventory Genie database benchmarks")
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS))
+    parser.add_argument("--rows", type=int, default=500000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    
+    BENCHMARKS[args.benchmark](args.rows, args.repeat)
+
+if __name__ == "__main__":
+    main()
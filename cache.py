@@ -0,0 +1,64 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+class LRUCache:
+    def __init__(self, maxsize: int = 1024, weigh: Optional[Callable[[Any], int]] = None):
+        self.maxsize = maxsize
+        self.weigh = weigh
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.weight = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+            return None
+    
+    def put(self, key: Hashable, value: Any):
+        if self.maxsize <= 0:
+            return
+        weight = self.weigh(value) if self.weigh else 1
+        with self._lock:
+            if key in self._entries:
+                self.weight -= self._entries.pop(key)[1]
+            if weight > self.maxsize:
+                return
+            self._entries[key] = (value, weight)
+            self._entries.move_to_end(key)
+            self.weight += weight
+            while self.weight > self.maxsize:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.weight -= evicted
+                self.evictions += 1
+    
+    def pop(self, *keys: Hashable):
+        with self._lock:
+            for key in keys:
+                entry = self._entries.pop(key, None)
+                if entry is not None:
+                    self.weight -= entry[1]
+    
+    def items(self) -> List[Tuple[Hashable, Any]]:
+        with self._lock:
+            return [(key, value) for key, (value, _) in self._entries.items()]
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.weight = 0
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'size': len(self._entries), 'weight': self.weight, 'maxsize': self.maxsize}
@@ -1,23 +1,166 @@
 import sqlite3
 import os
+import re
+import threading
+import unicodedata
+from contextlib import contextmanager
+from copy import copy
 from datetime import datetime
-from typing import List, Dict, Optional, Tuple
+from itertools import islice
+from types import SimpleNamespace
+from typing import Any, Callable, List, Dict, Iterator, Optional, Tuple
+from cache import LRUCache
+from records import Box, Material, MaterialImage, Project, ProjectImage, ProjectMaterial
+
+SCHEMA_VERSION = 10
+
+MATERIAL_FIELDS = ['box_id', 'name', 'brand', 'material_type', 'width', 'height',
+                   'depth', 'unit', 'quantity', 'color', 'tutorial_url', 'notes']
+
+DIMENSIONS = ['width', 'height', 'depth']
+
+MATERIAL_SORT_KEYS = {
+    'name': "m.name",
+    'id': "m.id",
+    'brand': "IFNULL(m.brand, '')",
+    'material_type': "IFNULL(m.material_type, '')",
+    'color': "IFNULL(m.color, '')",
+    'quantity': "IFNULL(m.quantity, 0)",
+    'area': "IFNULL(m.width_mm, 0) * IFNULL(m.height_mm, 0)",
+    'box_name': "IFNULL(m.box_name, '')",
+    'is_used': "IFNULL(m.is_used, 0)",
+}
+
+PROJECT_SORT_KEY = "IFNULL(p.created_at, '')"
+
+PAGE_SIZE = 500
+
+CHANGE_TRACKED_TABLES = ['boxes', 'materials', 'projects', 'project_materials']
+
+IMAGE_OWNERS = {'material_images': ('materials', 'material_id'), 'project_images': ('projects', 'project_id')}
+
+CHANGE_LOG_LIMIT = 10000
+
+PERFORMANCE_PRAGMAS = {
+    'journal_mode': "WAL",
+    'synchronous': "NORMAL",
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': "MEMORY",
+    'busy_timeout': 5000,
+}
+
+UNIT_TO_MM = {
+    'mm': 1.0, 'millimetre': 1.0, 'millimeter': 1.0,
+    'cm': 10.0, 'centimetre': 10.0, 'centimeter': 10.0,
+    'm': 1000.0, 'metre': 1000.0, 'meter': 1000.0,
+    'in': 25.4, 'inch': 25.4, 'inches': 25.4, '"': 25.4,
+    'ft': 304.8, 'foot': 304.8, 'feet': 304.8,
+}
+
+FTS_WEIGHTS = {'name': 10.0, 'brand': 5.0, 'material_type': 5.0, 'color': 3.0, 'notes': 1.0}
+
+def to_millimetres(value, unit: str) -> Optional[float]:
+    factor = UNIT_TO_MM.get((unit or "cm").strip().lower())
+    if value is None or factor is None:
+        return None
+    return round(float(value) * factor, 6)
+
+def material_sort_value(material: Dict, order_by: str = "name") -> Any:
+    if order_by == 'area':
+        return (material['width_mm'] or 0) * (material['height_mm'] or 0)
+    if order_by in ('quantity', 'is_used'):
+        return material[order_by] or 0
+    if order_by in ('brand', 'material_type', 'color', 'box_name'):
+        return material[order_by] or ""
+    return material[order_by]
+
+def fold_text(value: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", value or "")
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).lower()
+
+def text_matches(field: Optional[str], value: str, fulltext: bool = True) -> bool:
+    if not fulltext:
+        return value.lower() in (field or "").lower()
+    words = re.findall(r"\w+", fold_text(field))
+    return all(any(word.startswith(token) for word in words) for token in re.findall(r"\w+", fold_text(value)))
+
+def material_matches(material: Dict, filters: Dict, fulltext: bool = True) -> bool:
+    for column in ('name', 'brand', 'material_type', 'color'):
+        value = filters.get(column)
+        if value and not text_matches(material[column], value, fulltext):
+            return False
+    
+    unit = filters.get('unit', "cm")
+    for dimension in DIMENSIONS:
+        low = filters.get(f"min_{dimension}", 0)
+        high = filters.get(f"max_{dimension}", 0)
+        size = material[f"{dimension}_mm"]
+        if (low > 0 or high > 0) and size is None:
+            return False
+        if low > 0 and size < to_millimetres(low, unit):
+            return False
+        if high > 0 and size > to_millimetres(high, unit):
+            return False
+    
+    if not filters.get('include_used', True) and material['is_used']:
+        return False
+    if filters.get('box_id') is not None and material['box_id'] != filters['box_id']:
+        return False
+    return True
 
 class InventoryDatabase:
-    def __init__(self, db_path: str = "scrap_inventory.db"):
+    def __init__(self, db_path: str = "scrap_inventory.db", row_factory: str = "dict",
+                 pragmas: Optional[Dict] = None, cache_size: int = 1024):
+        if row_factory not in ("dict", "record"):
+            raise ValueError(f"Unknown row factory: {row_factory!r}")
         self.db_path = db_path
-        self.conn = None
-        self.cursor = None
+        self.row_factory = row_factory
+        self.pragmas = dict(PERFORMANCE_PRAGMAS, **(pragmas or {}))
+        self.pooled = db_path not in ("", ":memory:")
+        self._local = threading.local() if self.pooled else SimpleNamespace()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self.cache = LRUCache(cache_size)
         self.connect()
         self.create_tables()
+        self.migrate()
+        self.prune_change_log()
+        self.fts_enabled = self._virtual_table_available("materials_fts")
+        self.rtree_enabled = self._virtual_table_available("materials_rtree")
+    
+    def connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            return conn
+        
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        for name, value in self.pragmas.items():
+            if value is not None:
+                conn.execute(f"PRAGMA {name} = {value}")
+        
+        with self._connections_lock:
+            self._connections.append(conn)
+        self._local.conn = conn
+        self._local.transaction_depth = 0
+        self._local.pending_invalidations = set()
+        return conn
+    
+    @property
+    def conn(self) -> sqlite3.Connection:
+        return self.connect()
     
-    def connect(self):
-        self.conn = sqlite3.connect(self.db_path)
-        self.conn.row_factory = sqlite3.Row
-        self.cursor = self.conn.cursor()
+    @property
+    def _transaction_depth(self) -> int:
+        return getattr(self._local, 'transaction_depth', 0)
+    
+    @_transaction_depth.setter
+    def _transaction_depth(self, depth: int):
+        self._local.transaction_depth = depth
     
     def create_tables(self):
-        self.cursor.execute('''
+        self.conn.execute('''
             CREATE TABLE IF NOT EXISTS boxes (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 name TEXT NOT NULL,
@@ -27,7 +170,7 @@ class InventoryDatabase:
             )
         ''')
         
-        self.cursor.execute('''
+        self.conn.execute('''
             CREATE TABLE IF NOT EXISTS materials (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 box_id INTEGER,
@@ -49,7 +192,7 @@ class InventoryDatabase:
             )
         ''')
         
-        self.cursor.execute('''
+        self.conn.execute('''
             CREATE TABLE IF NOT EXISTS material_images (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 material_id INTEGER NOT NULL,
@@ -60,7 +203,7 @@ class InventoryDatabase:
             )
         ''')
         
-        self.cursor.execute('''
+        self.conn.execute('''
             CREATE TABLE IF NOT EXISTS projects (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 name TEXT NOT NULL,
@@ -70,7 +213,7 @@ class InventoryDatabase:
             )
         ''')
         
-        self.cursor.execute('''
+        self.conn.execute('''
             CREATE TABLE IF NOT EXISTS project_images (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 project_id INTEGER NOT NULL,
@@ -80,7 +223,7 @@ class InventoryDatabase:
             )
         ''')
         
-        self.cursor.execute('''
+        self.conn.execute('''
             CREATE TABLE IF NOT EXISTS project_materials (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 project_id INTEGER NOT NULL,
@@ -93,249 +236,899 @@ class InventoryDatabase:
         
         self.conn.commit()
     
+    def get_schema_version(self) -> int:
+        cursor = self.conn.execute("PRAGMA user_version")
+        return cursor.fetchone()[0]
+    
+    def migrate(self):
+        version = self.get_schema_version()
+        while version < SCHEMA_VERSION:
+            version += 1
+            with self.transaction():
+                getattr(self, f"_migrate_to_{version}")()
+                self.conn.execute(f"PRAGMA user_version = {version}")
+    
+    @contextmanager
+    def transaction(self):
+        savepoint = f"sp_{self._transaction_depth}"
+        if self._transaction_depth == 0:
+            if not self.conn.in_transaction:
+                self.conn.execute("BEGIN")
+        else:
+            self.conn.execute(f"SAVEPOINT {savepoint}")
+        self._transaction_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._transaction_depth -= 1
+            if self._transaction_depth == 0:
+                self.conn.rollback()
+                self._local.pending_invalidations.clear()
+            else:
+                self.conn.execute(f"ROLLBACK TO {savepoint}")
+                self.conn.execute(f"RELEASE {savepoint}")
+            self.cache.clear()
+            raise
+        self._transaction_depth -= 1
+        if self._transaction_depth == 0:
+            self.conn.commit()
+            self.cache.pop(*self._local.pending_invalidations)
+            self._local.pending_invalidations.clear()
+        else:
+            self.conn.execute(f"RELEASE {savepoint}")
+    
+    def _commit(self):
+        if self._transaction_depth == 0:
+            self.conn.commit()
+    
+    def _cached(self, key: Tuple, load: Callable[[], Any]) -> Any:
+        value = self.cache.get(key)
+        if value is None:
+            value = load()
+            if value is None:
+                return None
+            self.cache.put(key, value)
+        if isinstance(value, list):
+            return [copy(row) for row in value]
+        return copy(value)
+    
+    def _invalidate(self, *keys: Tuple):
+        self.cache.pop(*keys)
+        if self._transaction_depth > 0:
+            self._local.pending_invalidations.update(keys)
+    
+    def cache_stats(self) -> Dict[str, int]:
+        return self.cache.stats()
+    
+    def _convert_rows(self, rows: List, columns: List[str], kind: type) -> List[Dict]:
+        if self.row_factory == "record":
+            record = kind.for_columns(columns)
+            return [record(*row) for row in rows]
+        return [dict(zip(columns, row)) for row in rows]
+    
+    def _fetch_all(self, cursor: sqlite3.Cursor, kind: type) -> List[Dict]:
+        columns = [column[0] for column in cursor.description]
+        return self._convert_rows(cursor.fetchall(), columns, kind)
+    
+    def _fetch_one(self, cursor: sqlite3.Cursor, kind: type) -> Optional[Dict]:
+        columns = [column[0] for column in cursor.description]
+        row = cursor.fetchone()
+        return self._convert_rows([row], columns, kind)[0] if row else None
+    
+    def _migrate_to_1(self):
+        statements = [
+            "CREATE INDEX IF NOT EXISTS idx_boxes_name ON boxes (name)",
+            "CREATE INDEX IF NOT EXISTS idx_materials_name ON materials (name)",
+            "CREATE INDEX IF NOT EXISTS idx_materials_used_name ON materials (is_used, name)",
+            "CREATE INDEX IF NOT EXISTS idx_materials_box_used_name ON materials (box_id, is_used, name)",
+            "CREATE INDEX IF NOT EXISTS idx_material_images_material "
+            "ON material_images (material_id, is_primary DESC, created_at)",
+            "CREATE INDEX IF NOT EXISTS idx_projects_created ON projects (created_at)",
+            "CREATE INDEX IF NOT EXISTS idx_project_images_project ON project_images (project_id, created_at)",
+            "CREATE INDEX IF NOT EXISTS idx_project_materials_project ON project_materials (project_id, material_id)",
+            "CREATE INDEX IF NOT EXISTS idx_project_materials_material ON project_materials (material_id)",
+        ]
+        for statement in statements:
+            self.conn.execute(statement)
+    
+    def _migrate_to_2(self):
+        columns = ', '.join(FTS_WEIGHTS)
+        new_values = ', '.join(f"new.{column}" for column in FTS_WEIGHTS)
+        old_values = ', '.join(f"old.{column}" for column in FTS_WEIGHTS)
+        try:
+            self.conn.execute(f'''
+                CREATE VIRTUAL TABLE IF NOT EXISTS materials_fts USING fts5(
+                    {columns}, content='materials', content_rowid='id', prefix='2 3'
+                )
+            ''')
+        except sqlite3.OperationalError:
+            return
+        
+        self.conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS materials_fts_insert AFTER INSERT ON materials BEGIN
+                INSERT INTO materials_fts (rowid, {columns}) VALUES (new.id, {new_values});
+            END
+        ''')
+        self.conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS materials_fts_delete AFTER DELETE ON materials BEGIN
+                INSERT INTO materials_fts (materials_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+            END
+        ''')
+        self.conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS materials_fts_update AFTER UPDATE OF {columns} ON materials BEGIN
+                INSERT INTO materials_fts (materials_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+                INSERT INTO materials_fts (rowid, {columns}) VALUES (new.id, {new_values});
+            END
+        ''')
+        self.conn.execute("INSERT INTO materials_fts (materials_fts) VALUES ('rebuild')")
+    
+    def _migrate_to_3(self):
+        self._build_rtree_index(DIMENSIONS)
+    
+    def _migrate_to_4(self):
+        for dimension in DIMENSIONS:
+            self.conn.execute(f"ALTER TABLE materials ADD COLUMN {dimension}_mm REAL")
+        
+        self.conn.create_function("to_millimetres", 2, to_millimetres, deterministic=True)
+        self.conn.execute(f'''
+            UPDATE materials SET {', '.join(f"{dimension}_mm = to_millimetres({dimension}, unit)" for dimension in DIMENSIONS)}
+        ''')
+        
+        if self._virtual_table_available("materials_rtree"):
+            self._build_rtree_index([f"{dimension}_mm" for dimension in DIMENSIONS])
+    
+    def _migrate_to_5(self):
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS change_log (
+                version INTEGER PRIMARY KEY AUTOINCREMENT,
+                table_name TEXT NOT NULL,
+                row_id INTEGER NOT NULL,
+                op TEXT NOT NULL
+            )
+        ''')
+        for table in CHANGE_TRACKED_TABLES:
+            for event, row in (('insert', 'new'), ('update', 'new'), ('delete', 'old')):
+                self.conn.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS {table}_log_{event} AFTER {event.upper()} ON {table} BEGIN
+                        INSERT INTO change_log (table_name, row_id, op) VALUES ('{table}', {row}.id, '{event}');
+                    END
+                ''')
+    
+    def _migrate_to_6(self):
+        self.conn.execute("ALTER TABLE materials ADD COLUMN box_name TEXT")
+        self.conn.execute("UPDATE materials SET box_name = (SELECT name FROM boxes WHERE id = materials.box_id)")
+        self.conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS materials_box_name_update AFTER UPDATE OF box_id ON materials BEGIN
+                UPDATE materials SET box_name = (SELECT name FROM boxes WHERE id = new.box_id) WHERE id = new.id;
+            END
+        ''')
+        self.conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS boxes_name_update AFTER UPDATE OF name ON boxes BEGIN
+                UPDATE materials SET box_name = new.name WHERE box_id = new.id;
+            END
+        ''')
+        self.conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS boxes_name_delete AFTER DELETE ON boxes BEGIN
+                UPDATE materials SET box_name = NULL WHERE box_id = old.id;
+            END
+        ''')
+        for order_by in ('brand', 'material_type', 'color', 'quantity', 'area', 'box_name', 'is_used'):
+            expression = MATERIAL_SORT_KEYS[order_by].replace("m.", "")
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS idx_materials_sort_{order_by} ON materials ({expression}, id)")
+    
+    def _migrate_to_7(self):
+        for table in IMAGE_OWNERS:
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_path ON {table} (image_path)")
+    
+    def _migrate_to_8(self):
+        survivors = "SELECT MIN(id) FROM project_materials GROUP BY project_id, material_id"
+        self.conn.execute(f'''
+            UPDATE project_materials SET quantity_used = (
+                SELECT SUM(IFNULL(d.quantity_used, 1)) FROM project_materials d
+                WHERE d.project_id = project_materials.project_id AND d.material_id = project_materials.material_id
+            ) WHERE id IN ({survivors} HAVING COUNT(*) > 1)
+        ''')
+        self.conn.execute(f"DELETE FROM project_materials WHERE id NOT IN ({survivors})")
+        self.conn.execute("DROP INDEX IF EXISTS idx_project_materials_project")
+        self.conn.execute("CREATE UNIQUE INDEX idx_project_materials_project ON project_materials (project_id, material_id)")
+    
+    def _migrate_to_9(self):
+        self.conn.execute("DROP INDEX IF EXISTS idx_projects_created")
+        self.conn.execute(f"CREATE INDEX idx_projects_created ON projects ({PROJECT_SORT_KEY.replace('p.', '')}, id)")
+    
+    def _migrate_to_10(self):
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS completed_tasks (
+                name TEXT PRIMARY KEY,
+                completed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+    
+    def _build_rtree_index(self, source_columns: List[str]):
+        columns = ', '.join(f"min_{dimension}, max_{dimension}" for dimension in DIMENSIONS)
+        new_values = ', '.join(f"IFNULL(new.{column}, 0), IFNULL(new.{column}, 0)" for column in source_columns)
+        values = ', '.join(f"IFNULL({column}, 0), IFNULL({column}, 0)" for column in source_columns)
+        try:
+            self.conn.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS materials_rtree USING rtree(id, {columns})")
+        except sqlite3.OperationalError:
+            return
+        
+        self.conn.execute("DROP TRIGGER IF EXISTS materials_rtree_insert")
+        self.conn.execute("DROP TRIGGER IF EXISTS materials_rtree_update")
+        self.conn.execute(f'''
+            CREATE TRIGGER materials_rtree_insert AFTER INSERT ON materials BEGIN
+                INSERT INTO materials_rtree (id, {columns}) VALUES (new.id, {new_values});
+            END
+        ''')
+        self.conn.execute(f'''
+            CREATE TRIGGER materials_rtree_update AFTER UPDATE OF {', '.join(source_columns)} ON materials BEGIN
+                INSERT OR REPLACE INTO materials_rtree (id, {columns}) VALUES (new.id, {new_values});
+            END
+        ''')
+        self.conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS materials_rtree_delete AFTER DELETE ON materials BEGIN
+                DELETE FROM materials_rtree WHERE id = old.id;
+            END
+        ''')
+        self.conn.execute("DELETE FROM materials_rtree")
+        self.conn.execute(f"INSERT INTO materials_rtree (id, {columns}) SELECT id, {values} FROM materials")
+    
+    def _virtual_table_available(self, table: str) -> bool:
+        try:
+            self.conn.execute(f"SELECT rowid FROM {table} LIMIT 0")
+            return True
+        except sqlite3.OperationalError:
+            return False
+    
+    def data_version(self) -> Tuple[int, int]:
+        conn = self.conn
+        return conn.execute("PRAGMA data_version").fetchone()[0], conn.total_changes
+    
+    def change_version(self) -> int:
+        return self.conn.execute("SELECT IFNULL(MAX(version), 0) FROM change_log").fetchone()[0]
+    
+    def changes_since(self, version: int) -> Optional[List[Dict]]:
+        conn = self.conn
+        oldest = conn.execute("SELECT MIN(version) FROM change_log").fetchone()[0]
+        if oldest is not None and version < oldest - 1:
+            return None
+        
+        cursor = conn.execute('''
+            SELECT table_name, row_id, op, MAX(version) AS version
+            FROM change_log
+            WHERE version > ?
+            GROUP BY table_name, row_id
+            ORDER BY version
+        ''', (version,))
+        changes = [dict(row) for row in cursor.fetchall()]
+        
+        for change in changes:
+            table, row_id = change['table_name'], change['row_id']
+            if table == 'boxes':
+                self.cache.pop(('box', row_id), ('boxes',))
+            elif table == 'materials':
+                self.cache.pop(('material', row_id))
+            elif table == 'projects':
+                self.cache.pop(('project', row_id))
+        return changes
+    
+    def prune_change_log(self, keep: int = CHANGE_LOG_LIMIT) -> int:
+        cursor = self.conn.execute(
+            "DELETE FROM change_log WHERE version <= (SELECT MAX(version) FROM change_log) - ?", (keep,)
+        )
+        self._commit()
+        return cursor.rowcount
+    
     def add_box(self, name: str, location: str = "", description: str = "") -> int:
-        self.cursor.execute(
+        cursor = self.conn.execute(
             "INSERT INTO boxes (name, location, description) VALUES (?, ?, ?)",
             (name, location, description)
         )
-        self.conn.commit()
-        return self.cursor.lastrowid
+        self._commit()
+        self._invalidate(('boxes',))
+        return cursor.lastrowid
     
     def get_boxes(self) -> List[Dict]:
-        self.cursor.execute("SELECT * FROM boxes ORDER BY name")
-        return [dict(row) for row in self.cursor.fetchall()]
+        return self._cached(('boxes',), lambda: list(self.iter_boxes()))
+    
+    def iter_boxes(self, page_size: int = PAGE_SIZE, after: Optional[Tuple] = None) -> Iterator[Dict]:
+        return self._iter_pages(self.get_boxes_page, page_size, after)
+    
+    def get_boxes_page(self, page_size: int = PAGE_SIZE,
+                       after: Optional[Tuple] = None) -> Tuple[List[Dict], Optional[Tuple]]:
+        return self._fetch_page("SELECT b.*, b.name AS sort_key FROM boxes b", Box, "1=1", [],
+                                "b.name", "b.id", False, page_size, after)
+    
+    def get_box_summaries(self) -> List[Dict]:
+        cursor = self.conn.execute('''
+            SELECT b.*,
+                   COUNT(m.id) AS material_count,
+                   IFNULL(SUM(m.is_used = 0), 0) AS available_count,
+                   IFNULL(SUM(m.is_used = 1), 0) AS used_count,
+                   IFNULL(SUM(m.quantity), 0) AS total_quantity
+            FROM boxes b
+            LEFT JOIN materials m ON m.box_id = b.id
+            GROUP BY b.name, b.id
+            ORDER BY b.name, b.id
+        ''')
+        return self._fetch_all(cursor, Box)
     
     def get_box(self, box_id: int) -> Optional[Dict]:
-        self.cursor.execute("SELECT * FROM boxes WHERE id = ?", (box_id,))
-        row = self.cursor.fetchone()
-        return dict(row) if row else None
+        return self._cached(('box', box_id), lambda: self._fetch_one(
+            self.conn.execute("SELECT * FROM boxes WHERE id = ?", (box_id,)), Box))
     
     def update_box(self, box_id: int, name: str, location: str = "", description: str = ""):
-        self.cursor.execute(
+        self.conn.execute(
             "UPDATE boxes SET name = ?, location = ?, description = ? WHERE id = ?",
             (name, location, description, box_id)
         )
-        self.conn.commit()
+        self._commit()
+        self._invalidate(('box', box_id), ('boxes',), *self._box_material_keys(box_id))
     
     def delete_box(self, box_id: int):
-        self.cursor.execute("DELETE FROM boxes WHERE id = ?", (box_id,))
-        self.conn.commit()
+        self.conn.execute("DELETE FROM boxes WHERE id = ?", (box_id,))
+        self._commit()
+        self._invalidate(('box', box_id), ('boxes',), *self._box_material_keys(box_id))
+    
+    def _box_material_keys(self, box_id: int) -> List[Tuple]:
+        cursor = self.conn.execute("SELECT id FROM materials WHERE box_id = ?", (box_id,))
+        return [('material', row[0]) for row in cursor.fetchall()]
     
     def add_material(self, name: str, box_id: Optional[int] = None, brand: str = "", 
                     material_type: str = "", width: float = 0, height: float = 0, 
                     depth: float = 0, unit: str = "cm", quantity: int = 1, 
                     color: str = "", tutorial_url: str = "", notes: str = "") -> int:
-        self.cursor.execute('''
-            INSERT INTO materials (box_id, name, brand, material_type, width, height, 
-                                 depth, unit, quantity, color, tutorial_url, notes)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (box_id, name, brand, material_type, width, height, depth, unit, 
-              quantity, color, tutorial_url, notes))
-        self.conn.commit()
-        return self.cursor.lastrowid
+        values = (box_id, name, brand, material_type, width, height, depth, unit,
+                  quantity, color, tutorial_url, notes)
+        cursor = self.conn.execute(self._insert_material_sql(), values + self._canonical_dimensions(width, height, depth, unit))
+        self._commit()
+        return cursor.lastrowid
+    
+    def _insert_material_sql(self) -> str:
+        columns = MATERIAL_FIELDS + [f"{dimension}_mm" for dimension in DIMENSIONS]
+        placeholders = [f"?{position}" for position in range(1, len(columns) + 1)]
+        return (f"INSERT INTO materials ({', '.join(columns)}, box_name) "
+                f"VALUES ({', '.join(placeholders)}, (SELECT name FROM boxes WHERE id = ?1))")
+    
+    def _canonical_dimensions(self, width, height, depth, unit: str) -> Tuple:
+        return tuple(to_millimetres(value, unit) for value in (width, height, depth))
+    
+    def _material_values(self, row: Dict, box_id: Optional[int] = None) -> Tuple:
+        name = str(row.get('name') or "").strip()
+        if not name:
+            raise ValueError("Name is required")
+        
+        def text(key):
+            return str(row.get(key) or "").strip()
+        
+        def number(key, convert, default):
+            value = row.get(key)
+            if value is None or str(value).strip() == "":
+                return default
+            try:
+                return convert(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid {key}: {value!r}")
+        
+        width = number('width', float, 0)
+        height = number('height', float, 0)
+        depth = number('depth', float, 0)
+        unit = text('unit') or "cm"
+        return (row.get('box_id', box_id), name, text('brand'), text('material_type'),
+                width, height, depth, unit, number('quantity', int, 1), text('color'),
+                text('tutorial_url'), text('notes')) + self._canonical_dimensions(width, height, depth, unit)
+    
+    def add_materials_bulk(self, rows: List[Dict], box_id: Optional[int] = None,
+                           chunk_size: int = 500) -> List[Dict]:
+        results = [{'id': None, 'error': None} for _ in rows]
+        valid = []
+        for index, row in enumerate(rows):
+            try:
+                valid.append((index, self._material_values(row, box_id)))
+            except ValueError as e:
+                results[index]['error'] = str(e)
+        
+        if not valid:
+            return results
+        
+        query = self._insert_material_sql()
+        with self.transaction():
+            for start in range(0, len(valid), chunk_size):
+                chunk = valid[start:start + chunk_size]
+                try:
+                    with self.transaction():
+                        self.conn.executemany(query, [values for _, values in chunk])
+                        cursor = self.conn.execute("SELECT last_insert_rowid()")
+                        first_id = cursor.fetchone()[0] - len(chunk) + 1
+                except sqlite3.Error:
+                    for index, values in chunk:
+                        try:
+                            with self.transaction():
+                                cursor = self.conn.execute(query, values)
+                                results[index]['id'] = cursor.lastrowid
+                        except sqlite3.Error as e:
+                            results[index]['error'] = str(e)
+                else:
+                    for offset, (index, _) in enumerate(chunk):
+                        results[index]['id'] = first_id + offset
+        
+        self.prune_change_log()
+        return results
     
     def get_materials(self, box_id: Optional[int] = None, include_used: bool = True) -> List[Dict]:
-        if box_id is not None:
-            if include_used:
-                self.cursor.execute("SELECT * FROM materials WHERE box_id = ? ORDER BY name", (box_id,))
-            else:
-                self.cursor.execute("SELECT * FROM materials WHERE box_id = ? AND is_used = 0 ORDER BY name", (box_id,))
-        else:
-            if include_used:
-                self.cursor.execute("SELECT * FROM materials ORDER BY name")
-            else:
-                self.cursor.execute("SELECT * FROM materials WHERE is_used = 0 ORDER BY name")
-        return [dict(row) for row in self.cursor.fetchall()]
+        return list(self.iter_materials({'box_id': box_id, 'include_used': include_used}))
+    
+    def get_materials_with_box(self, filters: Optional[Dict] = None, order_by: str = "name",
+                               descending: bool = False, include_primary_image: bool = False) -> List[Dict]:
+        return list(self.iter_materials(filters, order_by, descending,
+                                        include_primary_image=include_primary_image))
+    
+    def iter_materials(self, filters: Optional[Dict] = None, order_by: str = "name", descending: bool = False,
+                       page_size: int = PAGE_SIZE, after: Optional[Tuple] = None,
+                       include_primary_image: bool = False) -> Iterator[Dict]:
+        def fetch(page_size, after):
+            return self.get_materials_page(filters, order_by, descending, page_size, after, include_primary_image)
+        return self._iter_pages(fetch, page_size, after)
+    
+    def get_materials_page(self, filters: Optional[Dict] = None, order_by: str = "name", descending: bool = False,
+                           page_size: int = PAGE_SIZE, after: Optional[Tuple] = None,
+                           include_primary_image: bool = False) -> Tuple[List[Dict], Optional[Tuple]]:
+        if order_by not in MATERIAL_SORT_KEYS:
+            raise ValueError(f"Cannot sort materials by {order_by!r}")
+        sort_key = MATERIAL_SORT_KEYS[order_by]
+        columns = self._material_columns(include_primary_image)
+        joins, where, params = self._material_filters(**(filters or {}))
+        return self._fetch_page(f"SELECT {columns}, {sort_key} AS sort_key FROM materials m{joins}", Material,
+                                where, params, sort_key, "m.id", descending, page_size, after)
+    
+    def get_material_page_anchors(self, filters: Optional[Dict] = None, order_by: str = "name",
+                                  descending: bool = False, page_size: int = PAGE_SIZE) -> Tuple[int, List[Tuple]]:
+        if order_by not in MATERIAL_SORT_KEYS:
+            raise ValueError(f"Cannot sort materials by {order_by!r}")
+        sort_key = MATERIAL_SORT_KEYS[order_by]
+        direction = "DESC" if descending else "ASC"
+        joins, where, params = self._material_filters(**(filters or {}))
+        
+        with self.transaction():
+            total = self.conn.execute(f"SELECT COUNT(*) FROM materials m{joins} WHERE {where}", params).fetchone()[0]
+            cursor = self.conn.execute(f'''
+                SELECT sort_key, id FROM (
+                    SELECT {sort_key} AS sort_key, m.id AS id,
+                           ROW_NUMBER() OVER (ORDER BY {sort_key} {direction}, m.id {direction}) AS position
+                    FROM materials m{joins}
+                    WHERE {where}
+                )
+                WHERE position % ? = 0
+            ''', params + [page_size])
+            return total, [tuple(row) for row in cursor.fetchall()]
+    
+    def _material_columns(self, include_primary_image: bool = False) -> str:
+        columns = "m.*"
+        if include_primary_image:
+            columns += (", (SELECT i.image_path FROM material_images i WHERE i.material_id = m.id "
+                        "ORDER BY i.is_primary DESC, i.created_at LIMIT 1) AS primary_image")
+        return columns
+    
+    def _fetch_page(self, select: str, kind: type, where: str, params: List, sort_key: str, id_column: str,
+                    descending: bool, page_size: int, after: Optional[Tuple]) -> Tuple[List[Dict], Optional[Tuple]]:
+        direction = "DESC" if descending else "ASC"
+        if after is not None:
+            where += f" AND ({sort_key}, {id_column}) {'<' if descending else '>'} (?, ?)"
+            params = params + list(after)
+        
+        cursor = self.conn.execute(
+            f"{select} WHERE {where} ORDER BY {sort_key} {direction}, {id_column} {direction} LIMIT ?",
+            params + [page_size]
+        )
+        columns = [column[0] for column in cursor.description][:-1]
+        raw_rows = cursor.fetchall()
+        rows = self._convert_rows(raw_rows, columns, kind)
+        
+        if len(rows) < page_size:
+            return rows, None
+        return rows, (raw_rows[-1][-1], rows[-1]['id'])
+    
+    def _iter_pages(self, fetch_page, page_size: int, after: Optional[Tuple]) -> Iterator[Dict]:
+        while True:
+            rows, after = fetch_page(page_size, after)
+            yield from rows
+            if after is None:
+                return
     
     def get_material(self, material_id: int) -> Optional[Dict]:
-        self.cursor.execute("SELECT * FROM materials WHERE id = ?", (material_id,))
-        row = self.cursor.fetchone()
-        return dict(row) if row else None
+        return self._cached(('material', material_id), lambda: self._fetch_one(
+            self.conn.execute("SELECT * FROM materials WHERE id = ?", (material_id,)), Material))
     
     def update_material(self, material_id: int, **kwargs):
-        allowed_fields = ['box_id', 'name', 'brand', 'material_type', 'width', 'height', 
-                         'depth', 'unit', 'quantity', 'color', 'tutorial_url', 'notes']
         updates = []
         values = []
         for key, value in kwargs.items():
-            if key in allowed_fields:
+            if key in MATERIAL_FIELDS:
                 updates.append(f"{key} = ?")
                 values.append(value)
         
+        if any(key in kwargs for key in DIMENSIONS + ['unit']):
+            current = self.get_material(material_id) or {}
+            merged = {key: kwargs.get(key, current.get(key)) for key in DIMENSIONS + ['unit']}
+            canonical = self._canonical_dimensions(merged['width'], merged['height'], merged['depth'], merged['unit'])
+            for dimension, value in zip(DIMENSIONS, canonical):
+                updates.append(f"{dimension}_mm = ?")
+                values.append(value)
+        
         if updates:
             values.append(material_id)
             query = f"UPDATE materials SET {', '.join(updates)} WHERE id = ?"
-            self.cursor.execute(query, values)
-            self.conn.commit()
+            self.conn.execute(query, values)
+            self._commit()
+            self._invalidate(('material', material_id))
     
     def mark_material_used(self, material_id: int, used: bool = True):
         used_date = datetime.now().isoformat() if used else None
-        self.cursor.execute(
+        self.conn.execute(
             "UPDATE materials SET is_used = ?, used_date = ? WHERE id = ?",
             (1 if used else 0, used_date, material_id)
         )
-        self.conn.commit()
+        self._commit()
+        self._invalidate(('material', material_id))
     
     def delete_material(self, material_id: int):
-        self.cursor.execute("DELETE FROM materials WHERE id = ?", (material_id,))
-        self.conn.commit()
+        self.conn.execute("DELETE FROM materials WHERE id = ?", (material_id,))
+        self._commit()
+        self._invalidate(('material', material_id))
     
     def search_materials(self, name: str = "", brand: str = "", material_type: str = "",
                         min_width: float = 0, max_width: float = 0,
                         min_height: float = 0, max_height: float = 0,
                         min_depth: float = 0, max_depth: float = 0,
-                        color: str = "", include_used: bool = True) -> List[Dict]:
-        query = "SELECT * FROM materials WHERE 1=1"
-        params = []
+                        color: str = "", include_used: bool = True, unit: str = "cm") -> List[Dict]:
+        joins, where, params = self._material_filters(
+            name=name, brand=brand, material_type=material_type, color=color,
+            min_width=min_width, max_width=max_width, min_height=min_height, max_height=max_height,
+            min_depth=min_depth, max_depth=max_depth, include_used=include_used, unit=unit
+        )
+        cursor = self.conn.execute(f"SELECT m.* FROM materials m{joins} WHERE {where} ORDER BY m.name, m.id", params)
+        return self._fetch_all(cursor, Material)
+    
+    def search_materials_fulltext(self, query: str = "", name: str = "", brand: str = "",
+                                  material_type: str = "", color: str = "", limit: Optional[int] = None,
+                                  order_by: Optional[str] = None, descending: bool = False,
+                                  include_primary_image: bool = False, **filters) -> List[Dict]:
+        if order_by is not None and order_by not in MATERIAL_SORT_KEYS:
+            raise ValueError(f"Cannot sort materials by {order_by!r}")
+        text_filters = {'name': name, 'brand': brand, 'material_type': material_type, 'color': color}
+        columns = self._material_columns(include_primary_image)
+        direction = "DESC" if descending else "ASC"
+        ordering = f"{MATERIAL_SORT_KEYS[order_by]} {direction}, m.id {direction}" if order_by else None
+        
+        if not self.fts_enabled:
+            joins, where, params = self._material_filters(text=query, **text_filters, **filters)
+            sql = f"SELECT {columns} FROM materials m{joins} WHERE {where} ORDER BY {ordering or 'm.name, m.id'}"
+        else:
+            match = self._fts_match_expression(query, text_filters)
+            if not match:
+                rows = self.iter_materials(filters, order_by or "name", descending, min(limit or PAGE_SIZE, PAGE_SIZE),
+                                           include_primary_image=include_primary_image)
+                return list(islice(rows, limit))
+            joins, where, params = self._material_filters(**filters)
+            relevance = f"bm25(materials_fts, {', '.join(str(w) for w in FTS_WEIGHTS.values())}), m.name"
+            sql = f'''
+                SELECT {columns} FROM materials_fts f
+                JOIN materials m ON m.id = f.rowid{joins}
+                WHERE materials_fts MATCH ? AND {where}
+                ORDER BY {ordering or relevance}
+            '''
+            params.insert(0, match)
         
-        if name:
-            query += " AND name LIKE ?"
-            params.append(f"%{name}%")
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        
+        cursor = self.conn.execute(sql, params)
+        return self._fetch_all(cursor, Material)
+    
+    def fulltext_filters(self, query: str = "", name: str = "", brand: str = "",
+                         material_type: str = "", color: str = "") -> Dict[str, str]:
+        text_filters = {'name': name, 'brand': brand, 'material_type': material_type, 'color': color}
+        if self.fts_enabled:
+            match = self._fts_match_expression(query, text_filters)
+            return {'match': match} if match else {}
+        return {key: value for key, value in dict(text_filters, text=query).items() if value}
+    
+    def _fts_match_expression(self, query: str, text_filters: Dict[str, str]) -> str:
+        terms = [f'"{token}"*' for token in re.findall(r"\w+", query or "")]
+        for column, value in text_filters.items():
+            terms.extend(f'{column} : "{token}"*' for token in re.findall(r"\w+", value or ""))
+        return " AND ".join(terms)
+    
+    def _material_filters(self, name: str = "", brand: str = "", material_type: str = "",
+                          min_width: float = 0, max_width: float = 0,
+                          min_height: float = 0, max_height: float = 0,
+                          min_depth: float = 0, max_depth: float = 0,
+                          color: str = "", include_used: bool = True, text: str = "",
+                          unit: str = "cm", box_id: Optional[int] = None,
+                          ids: Optional[List[int]] = None, match: str = "") -> Tuple[str, str, List]:
+        where = "1=1"
+        params = []
         
-        if brand:
-            query += " AND brand LIKE ?"
-            params.append(f"%{brand}%")
+        if match:
+            where += " AND m.id IN (SELECT rowid FROM materials_fts WHERE materials_fts MATCH ?)"
+            params.append(match)
         
-        if material_type:
-            query += " AND material_type LIKE ?"
-            params.append(f"%{material_type}%")
+        if ids is not None:
+            where += f" AND m.id IN ({', '.join('?' for _ in ids)})"
+            params.extend(ids)
         
-        if color:
-            query += " AND color LIKE ?"
-            params.append(f"%{color}%")
+        if box_id is not None:
+            where += " AND m.box_id = ?"
+            params.append(box_id)
         
-        if min_width > 0:
-            query += " AND width >= ?"
-            params.append(min_width)
+        for column, value in (('name', name), ('brand', brand), ('material_type', material_type), ('color', color)):
+            if value:
+                where += f" AND m.{column} LIKE ?"
+                params.append(f"%{value}%")
         
-        if max_width > 0:
-            query += " AND width <= ?"
-            params.append(max_width)
+        for token in (text or "").split():
+            where += " AND (" + " OR ".join(f"m.{column} LIKE ?" for column in FTS_WEIGHTS) + ")"
+            params.extend([f"%{token}%"] * len(FTS_WEIGHTS))
         
-        if min_height > 0:
-            query += " AND height >= ?"
-            params.append(min_height)
+        bounds = {
+            'width': (min_width, max_width),
+            'height': (min_height, max_height),
+            'depth': (min_depth, max_depth),
+        }
+        use_rtree = self.rtree_enabled and any(low > 0 or high > 0 for low, high in bounds.values())
+        joins = ""
         
-        if max_height > 0:
-            query += " AND height <= ?"
-            params.append(max_height)
+        if unit.strip().lower() not in UNIT_TO_MM:
+            raise ValueError(f"Unknown unit: {unit!r}")
         
-        if min_depth > 0:
-            query += " AND depth >= ?"
-            params.append(min_depth)
+        rtree_where = []
+        rtree_params = []
+        exact_where = ""
+        exact_params = []
+        for dimension, (low, high) in bounds.items():
+            if low > 0:
+                low = to_millimetres(low, unit)
+                rtree_where.append(f"max_{dimension} >= ?")
+                rtree_params.append(low)
+                exact_where += f" AND m.{dimension}_mm >= ?"
+                exact_params.append(low)
+            
+            if high > 0:
+                high = to_millimetres(high, unit)
+                rtree_where.append(f"min_{dimension} <= ?")
+                rtree_params.append(high)
+                exact_where += f" AND m.{dimension}_mm <= ?"
+                exact_params.append(high)
         
-        if max_depth > 0:
-            query += " AND depth <= ?"
-            params.append(max_depth)
+        if use_rtree:
+            where += f" AND m.id IN (SELECT id FROM materials_rtree WHERE {' AND '.join(rtree_where)})"
+            params.extend(rtree_params)
+        where += exact_where
+        params.extend(exact_params)
         
         if not include_used:
-            query += " AND is_used = 0"
-        
-        query += " ORDER BY name"
+            where += " AND +m.is_used = 0" if use_rtree else " AND m.is_used = 0"
         
-        self.cursor.execute(query, params)
-        return [dict(row) for row in self.cursor.fetchall()]
+        return joins, where, params
     
     def add_material_image(self, material_id: int, image_path: str, is_primary: bool = False) -> int:
         if is_primary:
-            self.cursor.execute(
+            self.conn.execute(
                 "UPDATE material_images SET is_primary = 0 WHERE material_id = ?",
                 (material_id,)
             )
         
-        self.cursor.execute(
+        cursor = self.conn.execute(
             "INSERT INTO material_images (material_id, image_path, is_primary) VALUES (?, ?, ?)",
             (material_id, image_path, 1 if is_primary else 0)
         )
-        self.conn.commit()
-        return self.cursor.lastrowid
+        self._commit()
+        return cursor.lastrowid
+    
+    def add_material_images(self, material_id: int, image_paths: List[str],
+                            primary_index: Optional[int] = None) -> List[int]:
+        if not image_paths:
+            return []
+        primary = image_paths[primary_index] if primary_index is not None else None
+        new_paths = self._new_image_paths('material_images', 'material_id', material_id, image_paths)
+        
+        with self.transaction():
+            if primary is not None:
+                self.conn.execute(
+                    "UPDATE material_images SET is_primary = (image_path = ?) WHERE material_id = ?",
+                    (primary, material_id)
+                )
+            return [
+                self.conn.execute(
+                    "INSERT INTO material_images (material_id, image_path, is_primary) VALUES (?, ?, ?)",
+                    (material_id, image_path, 1 if image_path == primary else 0)
+                ).lastrowid
+                for image_path in new_paths
+            ]
+    
+    def _new_image_paths(self, table: str, owner_id: str, owner: int, image_paths: List[str]) -> List[str]:
+        cursor = self.conn.execute(f"SELECT image_path FROM {table} WHERE {owner_id} = ?", (owner,))
+        existing = {row[0] for row in cursor.fetchall()}
+        return [image_path for image_path in dict.fromkeys(image_paths) if image_path not in existing]
     
     def get_material_images(self, material_id: int) -> List[Dict]:
-        self.cursor.execute(
+        cursor = self.conn.execute(
             "SELECT * FROM material_images WHERE material_id = ? ORDER BY is_primary DESC, created_at",
             (material_id,)
         )
-        return [dict(row) for row in self.cursor.fetchall()]
+        return self._fetch_all(cursor, MaterialImage)
     
     def delete_material_image(self, image_id: int):
-        self.cursor.execute("DELETE FROM material_images WHERE id = ?", (image_id,))
-        self.conn.commit()
+        self.conn.execute("DELETE FROM material_images WHERE id = ?", (image_id,))
+        self._commit()
     
     def add_project(self, name: str, description: str = "") -> int:
-        self.cursor.execute(
+        cursor = self.conn.execute(
             "INSERT INTO projects (name, description) VALUES (?, ?)",
             (name, description)
         )
-        self.conn.commit()
-        return self.cursor.lastrowid
+        self._commit()
+        return cursor.lastrowid
     
     def get_projects(self) -> List[Dict]:
-        self.cursor.execute("SELECT * FROM projects ORDER BY created_at DESC")
-        return [dict(row) for row in self.cursor.fetchall()]
+        return list(self.iter_projects())
+    
+    def iter_projects(self, page_size: int = PAGE_SIZE, after: Optional[Tuple] = None) -> Iterator[Dict]:
+        return self._iter_pages(self.get_projects_page, page_size, after)
+    
+    def get_projects_page(self, page_size: int = PAGE_SIZE,
+                          after: Optional[Tuple] = None) -> Tuple[List[Dict], Optional[Tuple]]:
+        return self._fetch_page(f"SELECT p.*, {PROJECT_SORT_KEY} AS sort_key FROM projects p", Project, "1=1", [],
+                                PROJECT_SORT_KEY, "p.id", True, page_size, after)
+    
+    def get_project_summaries(self) -> List[Dict]:
+        cursor = self.conn.execute(f'''
+            SELECT p.*,
+                   COUNT(m.id) AS material_count,
+                   IFNULL(SUM(CASE WHEN m.id IS NOT NULL THEN pm.quantity_used END), 0) AS total_quantity
+            FROM projects p
+            LEFT JOIN project_materials pm ON pm.project_id = p.id
+            LEFT JOIN materials m ON m.id = pm.material_id
+            GROUP BY {PROJECT_SORT_KEY}, p.id
+            ORDER BY {PROJECT_SORT_KEY} DESC, p.id DESC
+        ''')
+        return self._fetch_all(cursor, Project)
     
     def get_project(self, project_id: int) -> Optional[Dict]:
-        self.cursor.execute("SELECT * FROM projects WHERE id = ?", (project_id,))
-        row = self.cursor.fetchone()
-        return dict(row) if row else None
+        return self._cached(('project', project_id), lambda: self._fetch_one(
+            self.conn.execute("SELECT * FROM projects WHERE id = ?", (project_id,)), Project))
     
     def update_project(self, project_id: int, name: str, description: str = ""):
-        self.cursor.execute(
+        self.conn.execute(
             "UPDATE projects SET name = ?, description = ? WHERE id = ?",
             (name, description, project_id)
         )
-        self.conn.commit()
+        self._commit()
+        self._invalidate(('project', project_id))
     
     def complete_project(self, project_id: int):
-        self.cursor.execute(
+        self.conn.execute(
             "UPDATE projects SET completed_at = ? WHERE id = ?",
             (datetime.now().isoformat(), project_id)
         )
-        self.conn.commit()
+        self._commit()
+        self._invalidate(('project', project_id))
     
     def delete_project(self, project_id: int):
-        self.cursor.execute("DELETE FROM projects WHERE id = ?", (project_id,))
-        self.conn.commit()
+        self.conn.execute("DELETE FROM projects WHERE id = ?", (project_id,))
+        self._commit()
+        self._invalidate(('project', project_id))
     
     def add_project_image(self, project_id: int, image_path: str) -> int:
-        self.cursor.execute(
+        cursor = self.conn.execute(
             "INSERT INTO project_images (project_id, image_path) VALUES (?, ?)",
             (project_id, image_path)
         )
-        self.conn.commit()
-        return self.cursor.lastrowid
+        self._commit()
+        return cursor.lastrowid
+    
+    def add_project_images(self, project_id: int, image_paths: List[str]) -> List[int]:
+        new_paths = self._new_image_paths('project_images', 'project_id', project_id, image_paths)
+        with self.transaction():
+            return [
+                self.conn.execute(
+                    "INSERT INTO project_images (project_id, image_path) VALUES (?, ?)",
+                    (project_id, image_path)
+                ).lastrowid
+                for image_path in new_paths
+            ]
     
     def get_project_images(self, project_id: int) -> List[Dict]:
-        self.cursor.execute(
+        cursor = self.conn.execute(
             "SELECT * FROM project_images WHERE project_id = ? ORDER BY created_at",
             (project_id,)
         )
-        return [dict(row) for row in self.cursor.fetchall()]
+        return self._fetch_all(cursor, ProjectImage)
     
     def delete_project_image(self, image_id: int):
-        self.cursor.execute("DELETE FROM project_images WHERE id = ?", (image_id,))
-        self.conn.commit()
+        self.conn.execute("DELETE FROM project_images WHERE id = ?", (image_id,))
+        self._commit()
+    
+    def task_completed(self, name: str) -> bool:
+        cursor = self.conn.execute("SELECT 1 FROM completed_tasks WHERE name = ?", (name,))
+        return cursor.fetchone() is not None
+    
+    def complete_task(self, name: str):
+        self.conn.execute("INSERT OR IGNORE INTO completed_tasks (name) VALUES (?)", (name,))
+        self._commit()
+    
+    def get_image_paths(self) -> List[str]:
+        cursor = self.conn.execute(" UNION ".join(f"SELECT image_path FROM {table}" for table in IMAGE_OWNERS))
+        return [row[0] for row in cursor.fetchall()]
+    
+    def count_image_references(self, image_path: str) -> int:
+        count = 0
+        for table, (owner, owner_id) in IMAGE_OWNERS.items():
+            cursor = self.conn.execute(
+                f"SELECT COUNT(*) FROM {table} i JOIN {owner} o ON o.id = i.{owner_id} WHERE i.image_path = ?",
+                (image_path,)
+            )
+            count += cursor.fetchone()[0]
+        return count
+    
+    def relink_images(self, paths: Dict[str, str]):
+        for table, (_, owner_id) in IMAGE_OWNERS.items():
+            self.conn.executemany(f"UPDATE {table} SET image_path = ? WHERE image_path = ?",
+                                  [(new, old) for old, new in paths.items()])
+            survivors = f"SELECT MIN(id) FROM {table} GROUP BY {owner_id}, image_path"
+            if table == 'material_images':
+                self.conn.execute(f"UPDATE {table} SET is_primary = 1 WHERE id IN ({survivors} HAVING MAX(is_primary) = 1)")
+            self.conn.execute(f"DELETE FROM {table} WHERE id NOT IN ({survivors})")
+        self._commit()
     
     def add_project_material(self, project_id: int, material_id: int, quantity_used: int = 1) -> int:
-        self.cursor.execute(
+        cursor = self.conn.execute(
             "INSERT INTO project_materials (project_id, material_id, quantity_used) VALUES (?, ?, ?)",
             (project_id, material_id, quantity_used)
         )
-        self.conn.commit()
-        return self.cursor.lastrowid
+        self._commit()
+        return cursor.lastrowid
     
     def get_project_materials(self, project_id: int) -> List[Dict]:
-        self.cursor.execute('''
+        cursor = self.conn.execute('''
             SELECT pm.*, m.name, m.brand, m.material_type 
             FROM project_materials pm
             JOIN materials m ON pm.material_id = m.id
             WHERE pm.project_id = ?
         ''', (project_id,))
-        return [dict(row) for row in self.cursor.fetchall()]
+        return self._fetch_all(cursor, ProjectMaterial)
+    
+    def set_project_materials(self, project_id: int, materials: List[Tuple[int, int]]) -> Dict[str, int]:
+        wanted = {}
+        for material_id, quantity_used in materials:
+            wanted[material_id] = wanted.get(material_id, 0) + (1 if quantity_used is None else quantity_used)
+        cursor = self.conn.execute(
+            "SELECT material_id, quantity_used FROM project_materials WHERE project_id = ?",
+            (project_id,)
+        )
+        existing = {row[0]: row[1] for row in cursor.fetchall()}
+        removed = [(project_id, material_id) for material_id in existing if material_id not in wanted]
+        changed = [(project_id, material_id, quantity_used) for material_id, quantity_used in wanted.items()
+                   if existing.get(material_id) != quantity_used]
+        
+        with self.transaction():
+            self.conn.executemany("DELETE FROM project_materials WHERE project_id = ? AND material_id = ?", removed)
+            self.conn.executemany('''
+                INSERT INTO project_materials (project_id, material_id, quantity_used) VALUES (?, ?, ?)
+                ON CONFLICT (project_id, material_id) DO UPDATE SET quantity_used = excluded.quantity_used
+            ''', changed)
+        
+        inserted = sum(material_id not in existing for _, material_id, _ in changed)
+        return {'inserted': inserted, 'updated': len(changed) - inserted, 'deleted': len(removed)}
     
     def remove_project_material(self, project_material_id: int):
-        self.cursor.execute("DELETE FROM project_materials WHERE id = ?", (project_material_id,))
-        self.conn.commit()
+        self.conn.execute("DELETE FROM project_materials WHERE id = ?", (project_material_id,))
+        self._commit()
     
     def close(self):
-        if self.conn:
-            self.conn.close()
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local() if self.pooled else SimpleNamespace()
@@ -2,22 +2,26 @@ import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 from PIL import Image, ImageTk
 import os
-import shutil
-from datetime import datetime
+from thumbnails import THUMBNAIL_SIZES
+from gui.ingest_progress import IngestProgress
 
 class AddMaterialDialog:
-    def __init__(self, parent, db, material_id=None):
+    def __init__(self, parent, db, ingestor, material_id=None):
         self.parent = parent
         self.db = db
+        self.ingestor = ingestor
         self.material_id = material_id
         self.result = None
         self.image_paths = []
+        self.stored_paths = set()
+        self.futures = []
         
         self.dialog = tk.Toplevel(parent)
         self.dialog.title("Edit Material" if material_id else "Add Material")
         self.dialog.geometry("700x800")
         self.dialog.transient(parent)
         self.dialog.grab_set()
+        self.dialog.protocol("WM_DELETE_WINDOW", self.cancel)
         
         self.create_widgets()
         
@@ -133,8 +137,10 @@ class AddMaterialDialog:
         button_frame = ttk.Frame(self.dialog)
         button_frame.pack(fill=tk.X, padx=10, pady=10)
         
-        ttk.Button(button_frame, text="Save", command=self.save).pack(side=tk.RIGHT, padx=5)
+        self.save_button = ttk.Button(button_frame, text="Save", command=self.save)
+        self.save_button.pack(side=tk.RIGHT, padx=5)
         ttk.Button(button_frame, text="Cancel", command=self.cancel).pack(side=tk.RIGHT, padx=5)
+        self.progress = IngestProgress(button_frame)
     
     def load_material_data(self):
         material = self.db.get_material(self.material_id)
@@ -165,6 +171,7 @@ class AddMaterialDialog:
         images = self.db.get_material_images(self.material_id)
         for img in images:
             self.image_paths.append(img['image_path'])
+            self.stored_paths.add(img['image_path'])
             self.image_list.insert(tk.END, os.path.basename(img['image_path']))
     
     def add_images(self):
@@ -207,59 +214,53 @@ class AddMaterialDialog:
         tutorial_url = self.tutorial_entry.get().strip()
         notes = self.notes_text.get("1.0", tk.END).strip()
         
-        if self.material_id:
-            self.db.update_material(
-                self.material_id,
-                name=name,
-                brand=brand,
-                material_type=material_type,
-                box_id=box_id,
-                width=width,
-                height=height,
-                depth=depth,
-                unit=unit,
-                quantity=quantity,
-                color=color,
-                tutorial_url=tutorial_url,
-                notes=notes
-            )
-            material_id = self.material_id
-        else:
-            material_id = self.db.add_material(
-                name=name,
-                brand=brand,
-                material_type=material_type,
-                box_id=box_id,
-                width=width,
-                height=height,
-                depth=depth,
-                unit=unit,
-                quantity=quantity,
-                color=color,
-                tutorial_url=tutorial_url,
-                notes=notes
-            )
-        
-        if not os.path.exists("images/materials"):
-            os.makedirs("images/materials")
-        
-        for idx, img_path in enumerate(self.image_paths):
-            if os.path.exists(img_path):
-                ext = os.path.splitext(img_path)[1]
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                new_filename = f"material_{material_id}_{timestamp}_{idx}{ext}"
-                new_path = os.path.join("images/materials", new_filename)
-                
-                if img_path != new_path:
-                    shutil.copy2(img_path, new_path)
+        fields = {
+            'name': name,
+            'brand': brand,
+            'material_type': material_type,
+            'box_id': box_id,
+            'width': width,
+            'height': height,
+            'depth': depth,
+            'unit': unit,
+            'quantity': quantity,
+            'color': color,
+            'tutorial_url': tutorial_url,
+            'notes': notes
+        }
+        
+        new_images = [img_path for img_path in self.image_paths
+                      if img_path not in self.stored_paths and os.path.exists(img_path)]
+        self.futures = self.ingestor.submit(new_images, [THUMBNAIL_SIZES['material']])
+        self.save_button.config(state=tk.DISABLED)
+        self.progress.wait(self.futures, lambda: self.finish_save(fields, new_images))
+    
+    def finish_save(self, fields, new_images):
+        try:
+            ingested = {img_path: future.result()[0] for img_path, future in zip(new_images, self.futures)}
+            image_paths = [ingested.get(img_path, img_path) for img_path in self.image_paths
+                           if img_path in ingested or img_path in self.stored_paths]
+            with self.db.transaction():
+                if self.material_id:
+                    self.db.update_material(self.material_id, **fields)
+                    material_id = self.material_id
+                else:
+                    material_id = self.db.add_material(**fields)
                 
-                existing_images = self.db.get_material_images(material_id)
-                if img_path not in [img['image_path'] for img in existing_images]:
-                    self.db.add_material_image(material_id, new_path, is_primary=(idx == 0))
+                self.db.add_material_images(material_id, image_paths, primary_index=0)
+        except Exception as e:
+            self.ingestor.discard(self.futures)
+            self.futures = []
+            self.save_button.config(state=tk.NORMAL)
+            messagebox.showerror("Error", f"Failed to save material: {str(e)}")
+            return
         
+        self.futures = []
         self.result = material_id
         messagebox.showinfo("Success", "Material saved successfully")
         self.dialog.destroy()
     
     def cancel(self):
+        self.progress.cancel()
+        self.ingestor.discard(self.futures)
         self.dialog.destroy()
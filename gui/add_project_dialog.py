@@ -1,8 +1,8 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import os
-import shutil
-from datetime import datetime
+from thumbnails import THUMBNAIL_SIZES
+from gui.ingest_progress import IngestProgress
 
 class AddProjectDialog:
     def __init__(self, parent, db, materials_tab, project_id=None):
@@ -12,6 +12,8 @@ class AddProjectDialog:
         self.project_id = project_id
         self.result = None
         self.image_paths = []
+        self.stored_paths = set()
+        self.futures = []
         self.selected_materials = []
         
         self.dialog = tk.Toplevel(parent)
@@ -19,6 +21,7 @@ class AddProjectDialog:
         self.dialog.geometry("900x700")
         self.dialog.transient(parent)
         self.dialog.grab_set()
+        self.dialog.protocol("WM_DELETE_WINDOW", self.cancel)
         
         self.create_widgets()
         
@@ -90,8 +93,10 @@ class AddProjectDialog:
         button_frame = ttk.Frame(self.dialog)
         button_frame.pack(fill=tk.X, padx=10, pady=10)
         
-        ttk.Button(button_frame, text="Save", command=self.save).pack(side=tk.RIGHT, padx=5)
+        self.save_button = ttk.Button(button_frame, text="Save", command=self.save)
+        self.save_button.pack(side=tk.RIGHT, padx=5)
         ttk.Button(button_frame, text="Cancel", command=self.cancel).pack(side=tk.RIGHT, padx=5)
+        self.progress = IngestProgress(button_frame)
     
     def load_project_data(self):
         project = self.db.get_project(self.project_id)
@@ -123,6 +128,7 @@ class AddProjectDialog:
         images = self.db.get_project_images(self.project_id)
         for img in images:
             self.image_paths.append(img['image_path'])
+            self.stored_paths.add(img['image_path'])
             self.image_list.insert(tk.END, os.path.basename(img['image_path']))
     
     def add_material(self):
@@ -214,39 +220,39 @@ class AddProjectDialog:
         
         description = self.description_text.get("1.0", tk.END).strip()
         
-        if self.project_id:
-            self.db.update_project(self.project_id, name, description)
-            project_id = self.project_id
-            
-            existing_materials = self.db.get_project_materials(project_id)
-            for mat in existing_materials:
-                self.db.remove_project_material(mat['id'])
-        else:
-            project_id = self.db.add_project(name, description)
-        
-        for mat in self.selected_materials:
-            self.db.add_project_material(project_id, mat['material_id'], mat['quantity_used'])
-        
-        if not os.path.exists("images/projects"):
-            os.makedirs("images/projects")
-        
-        for idx, img_path in enumerate(self.image_paths):
-            if os.path.exists(img_path):
-                ext = os.path.splitext(img_path)[1]
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                new_filename = f"project_{project_id}_{timestamp}_{idx}{ext}"
-                new_path = os.path.join("images/projects", new_filename)
+        new_images = [img_path for img_path in self.image_paths
+                      if img_path not in self.stored_paths and os.path.exists(img_path)]
+        self.futures = self.materials_tab.ingestor.submit(new_images, [THUMBNAIL_SIZES['project']])
+        self.save_button.config(state=tk.DISABLED)
+        self.progress.wait(self.futures, lambda: self.finish_save(name, description))
+    
+    def finish_save(self, name, description):
+        try:
+            stored = [future.result()[0] for future in self.futures]
+            with self.db.transaction():
+                if self.project_id:
+                    self.db.update_project(self.project_id, name, description)
+                    project_id = self.project_id
+                else:
+                    project_id = self.db.add_project(name, description)
                 
-                if img_path != new_path:
-                    shutil.copy2(img_path, new_path)
+                self.db.set_project_materials(project_id, [(mat['material_id'], mat['quantity_used'])
+                                                           for mat in self.selected_materials])
                 
-                existing_images = self.db.get_project_images(project_id)
-                if img_path not in [img['image_path'] for img in existing_images]:
-                    self.db.add_project_image(project_id, new_path)
+                self.db.add_project_images(project_id, stored)
+        except Exception as e:
+            self.materials_tab.ingestor.discard(self.futures)
+            self.futures = []
+            self.save_button.config(state=tk.NORMAL)
+            messagebox.showerror("Error", f"Failed to save project: {str(e)}")
+            return
         
+        self.futures = []
         self.result = project_id
         messagebox.showinfo("Success", "Project saved successfully")
         self.dialog.destroy()
     
     def cancel(self):
+        self.progress.cancel()
+        self.materials_tab.ingestor.discard(self.futures)
         self.dialog.destroy()
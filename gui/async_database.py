@@ -0,0 +1,108 @@
+import queue
+import sys
+import threading
+from tkinter import messagebox
+
+DELIVERY_INTERVAL_MS = 20
+
+class AsyncInventoryDatabase:
+    def __init__(self, widget, db, interval=DELIVERY_INTERVAL_MS):
+        self.widget = widget
+        self.db = db
+        self.interval = interval
+        self.requests = queue.Queue()
+        self.results = queue.Queue()
+        self.lock = threading.Lock()
+        self.latest = {}
+        self.running = None
+        self.pending = 0
+        self.counter = 0
+        self.after_id = None
+        self.worker_conn = None
+        self.worker = threading.Thread(target=self.run, name="inventory-db", daemon=True)
+        self.worker.start()
+    
+    def submit(self, method, *args, callback=None, error_callback=None, key=None, **kwargs):
+        with self.lock:
+            self.counter += 1
+            token = self.counter
+            self.pending += 1
+            if key is not None:
+                self.latest[key] = token
+                if self.running and self.running[1] == key and self.worker_conn:
+                    self.worker_conn.interrupt()
+        
+        self.requests.put((token, key, method, args, kwargs, callback, error_callback))
+        self.schedule()
+        return token
+    
+    def cancel(self, key):
+        self.submit(lambda: None, key=key)
+    
+    def is_current(self, token, key):
+        return key is None or self.latest.get(key) == token
+    
+    def run(self):
+        self.worker_conn = self.db.conn if self.db.pooled else None
+        while True:
+            request = self.requests.get()
+            if request is None:
+                return
+            
+            token, key, method, args, kwargs, callback, error_callback = request
+            with self.lock:
+                if not self.is_current(token, key):
+                    self.results.put((token, key, None, None, None))
+                    continue
+                self.running = (token, key)
+            
+            try:
+                function = getattr(self.db, method) if isinstance(method, str) else method
+                self.results.put((token, key, callback, function(*args, **kwargs), None))
+            except Exception as e:
+                self.results.put((token, key, error_callback, None, e))
+            finally:
+                with self.lock:
+                    self.running = None
+    
+    def schedule(self):
+        if self.after_id is None:
+            self.after_id = self.widget.after(self.interval, self.deliver)
+    
+    def deliver(self):
+        self.after_id = None
+        while True:
+            try:
+                token, key, callback, result, error = self.results.get_nowait()
+            except queue.Empty:
+                break
+            
+            with self.lock:
+                self.pending -= 1
+                current = self.is_current(token, key)
+            if not current:
+                continue
+            
+            if error is not None:
+                if callback:
+                    self.run_callback(callback, error)
+                else:
+                    messagebox.showerror("Error", str(error))
+            elif callback:
+                self.run_callback(callback, result)
+        
+        if self.pending:
+            self.schedule()
+    
+    def run_callback(self, callback, value):
+        try:
+            callback(value)
+        except Exception:
+            self.widget._root().report_callback_exception(*sys.exc_info())
+    
+    def close(self):
+        if self.after_id:
+            self.widget.after_cancel(self.after_id)
+            self.after_id = None
+        self.requests.put(None)
+        self.worker.join(5)
@@ -1,17 +1,23 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 from gui.add_box_dialog import AddBoxDialog
+from gui.tree_sync import SortedTree
+from gui.load_status import LoadStatus
 
 class BoxesTab:
-    def __init__(self, parent, db, materials_tab):
+    def __init__(self, parent, db, adb, materials_tab, monitor):
         self.parent = parent
         self.db = db
+        self.adb = adb
         self.materials_tab = materials_tab
+        self.monitor = monitor
         self.frame = ttk.Frame(parent)
-        self.current_boxes = []
         
         self.create_widgets()
+        self.rows = SortedTree(self.tree, lambda box: box['name'], self.box_values,
+                               on_progress=self.status.progress)
         self.load_boxes()
+        monitor.subscribe(self.apply_changes)
     
     def create_widgets(self):
         toolbar = ttk.Frame(self.frame)
@@ -22,6 +28,7 @@ class BoxesTab:
         ttk.Button(toolbar, text="Delete", command=self.delete_box).pack(side=tk.LEFT, padx=2)
         ttk.Button(toolbar, text="View Materials", command=self.view_materials).pack(side=tk.LEFT, padx=2)
         ttk.Button(toolbar, text="Refresh", command=self.load_boxes).pack(side=tk.LEFT, padx=2)
+        self.status = LoadStatus(toolbar, self.cancel_load)
         
         list_frame = ttk.Frame(self.frame)
         list_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
@@ -52,30 +59,38 @@ class BoxesTab:
         self.tree.bind("<Double-1>", lambda e: self.view_materials())
     
     def load_boxes(self):
-        self.tree.delete(*self.tree.get_children())
-        self.current_boxes = self.db.get_boxes()
-        
-        for box in self.current_boxes:
-            materials = self.db.get_materials(box_id=box['id'])
-            material_count = len(materials)
-            
-            description = box['description'][:50] + "..." if box['description'] and len(box['description']) > 50 else (box['description'] or "")
-            
-            created = box['created_at'][:10] if box['created_at'] else ""
-            
-            self.tree.insert("", tk.END, values=(
-                box['id'],
-                box['name'],
-                box['location'] or "",
-                description,
-                material_count,
-                created
-            ))
+        self.status.busy()
+        self.adb.submit('get_box_summaries', callback=self.rows.reset, key='boxes')
+    
+    def cancel_load(self):
+        self.adb.cancel('boxes')
+        if self.rows.loading:
+            self.rows.cancel()
+        else:
+            self.status.idle("Load cancelled")
+    
+    def apply_changes(self, changes):
+        if changes is None or 'boxes' in changes or 'materials' in changes:
+            self.adb.submit('get_box_summaries', callback=self.rows.sync, key='boxes')
+    
+    def box_values(self, box):
+        description = box['description'][:50] + "..." if box['description'] and len(box['description']) > 50 else (box['description'] or "")
+        
+        created = box['created_at'][:10] if box['created_at'] else ""
+        
+        return (
+            box['id'],
+            box['name'],
+            box['location'] or "",
+            description,
+            box['material_count'],
+            created
+        )
     
     def add_box(self):
         dialog = AddBoxDialog(self.frame, self.db)
         if dialog.result:
-            self.load_boxes()
+            self.monitor.poll()
     
     def edit_box(self):
         selection = self.tree.selection()
@@ -88,7 +103,7 @@ class BoxesTab:
         
         dialog = AddBoxDialog(self.frame, self.db, box_id)
         if dialog.result:
-            self.load_boxes()
+            self.monitor.poll()
     
     def delete_box(self):
         selection = self.tree.selection()
@@ -111,7 +126,7 @@ class BoxesTab:
                 return
         
         self.db.delete_box(box_id)
-        self.load_boxes()
+        self.monitor.poll()
         messagebox.showinfo("Success", "Box deleted successfully")
     
     def view_materials(self):
@@ -3,6 +3,9 @@ from tkinter import ttk, messagebox
 import csv
 from io import StringIO
 
+BULK_COLUMNS = ['name', 'brand', 'material_type', 'width', 'height', 'depth',
+                'unit', 'quantity', 'color', 'tutorial_url', 'notes']
+
 class BulkAddDialog:
     def __init__(self, parent, db):
         self.parent = parent
@@ -83,9 +86,9 @@ class BulkAddDialog:
         box_id = self.box_options.get(box_name)
         
         lines = text_content.split('\n')
-        success_count = 0
-        error_count = 0
-        errors = []
+        rows = []
+        line_numbers = []
+        line_errors = []
         
         for line_num, line in enumerate(lines, 1):
             line = line.strip()
@@ -95,49 +98,24 @@ class BulkAddDialog:
             try:
                 reader = csv.reader(StringIO(line))
                 row = next(reader)
-                
-                if len(row) < 1:
-                    errors.append(f"Line {line_num}: Empty line")
-                    error_count += 1
-                    continue
-                
-                name = row[0].strip() if len(row) > 0 else ""
-                brand = row[1].strip() if len(row) > 1 else ""
-                material_type = row[2].strip() if len(row) > 2 else ""
-                width = float(row[3]) if len(row) > 3 and row[3].strip() else 0
-                height = float(row[4]) if len(row) > 4 and row[4].strip() else 0
-                depth = float(row[5]) if len(row) > 5 and row[5].strip() else 0
-                unit = row[6].strip() if len(row) > 6 and row[6].strip() else "cm"
-                quantity = int(row[7]) if len(row) > 7 and row[7].strip() else 1
-                color = row[8].strip() if len(row) > 8 else ""
-                tutorial_url = row[9].strip() if len(row) > 9 else ""
-                notes = row[10].strip() if len(row) > 10 else ""
-                
-                if not name:
-                    errors.append(f"Line {line_num}: Name is required")
-                    error_count += 1
-                    continue
-                
-                self.db.add_material(
-                    name=name,
-                    box_id=box_id,
-                    brand=brand,
-                    material_type=material_type,
-                    width=width,
-                    height=height,
-                    depth=depth,
-                    unit=unit,
-                    quantity=quantity,
-                    color=color,
-                    tutorial_url=tutorial_url,
-                    notes=notes
-                )
-                
-                success_count += 1
-                
             except Exception as e:
-                errors.append(f"Line {line_num}: {str(e)}")
-                error_count += 1
+                line_errors.append((line_num, str(e)))
+                continue
+            
+            rows.append(dict(zip(BULK_COLUMNS, row)))
+            line_numbers.append(line_num)
+        
+        results = self.db.add_materials_bulk(rows, box_id=box_id)
+        
+        success_count = 0
+        for line_num, result in zip(line_numbers, results):
+            if result['error']:
+                line_errors.append((line_num, result['error']))
+            else:
+                success_count += 1
+        
+        errors = [f"Line {line_num}: {error}" for line_num, error in sorted(line_errors)]
+        error_count = len(errors)
         
         result_msg = f"Import completed:\n{success_count} materials added successfully"
         
@@ -0,0 +1,59 @@
+POLL_INTERVAL_MS = 1000
+
+class ChangeMonitor:
+    def __init__(self, widget, db, adb, interval=POLL_INTERVAL_MS):
+        self.widget = widget
+        self.db = db
+        self.adb = adb
+        self.interval = interval
+        self.listeners = []
+        self.version = db.change_version()
+        self.data_version = db.data_version()
+        self.after_id = None
+    
+    def subscribe(self, callback):
+        self.listeners.append(callback)
+    
+    def start(self):
+        self.after_id = self.widget.after(self.interval, self.tick)
+    
+    def stop(self):
+        if self.after_id:
+            self.widget.after_cancel(self.after_id)
+            self.after_id = None
+    
+    def tick(self):
+        self.poll()
+        self.start()
+    
+    def poll(self):
+        data_version = self.db.data_version()
+        if data_version == self.data_version:
+            return
+        self.data_version = data_version
+        self.adb.submit(self.read_changes, self.version, callback=self.apply_changes, key='changes')
+    
+    def read_changes(self, version):
+        changes = self.db.changes_since(version)
+        if changes is None:
+            return None, self.db.change_version()
+        if changes:
+            self.db.prune_change_log()
+        return changes, changes[-1]['version'] if changes else version
+    
+    def apply_changes(self, result):
+        changes, self.version = result
+        if changes is None:
+            self.notify(None)
+            return
+        if not changes:
+            return
+        
+        grouped = {}
+        for change in changes:
+            grouped.setdefault(change['table_name'], {})[change['row_id']] = change['op']
+        self.notify(grouped)
+    
+    def notify(self, changes):
+        for callback in self.listeners:
+            callback(changes)
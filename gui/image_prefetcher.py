@@ -0,0 +1,97 @@
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+PREFETCH_RADIUS = 2
+PREFETCH_WORKERS = 2
+DELIVERY_INTERVAL_MS = 20
+
+class ImagePrefetcher:
+    def __init__(self, widget, thumbnails, size, radius=PREFETCH_RADIUS, workers=PREFETCH_WORKERS,
+                 interval=DELIVERY_INTERVAL_MS):
+        self.widget = widget
+        self.thumbnails = thumbnails
+        self.size = size
+        self.radius = radius
+        self.interval = interval
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image-prefetch")
+        self.results = queue.Queue()
+        self.futures = {}
+        self.images = {}
+        self.callbacks = {}
+        self.after_id = None
+        self.closed = False
+    
+    @property
+    def pending(self):
+        return len(self.futures)
+    
+    def get(self, path):
+        return self.images.get(path)
+    
+    def load(self, path, callback):
+        if path in self.images:
+            self.callbacks = {}
+            callback(self.images[path], None)
+            return
+        self.callbacks = {path: callback}
+        self.submit(path)
+    
+    def prefetch(self, paths, index):
+        window = range(max(0, index - self.radius), min(len(paths), index + self.radius + 1))
+        wanted = [paths[position] for position in sorted(window, key=lambda position: abs(position - index))]
+        for path in list(self.futures):
+            if path not in wanted and path not in self.callbacks and self.futures[path].cancel():
+                del self.futures[path]
+        for path in list(self.images):
+            if path not in wanted:
+                del self.images[path]
+        
+        for path in wanted:
+            if path not in self.images:
+                self.submit(path)
+    
+    def submit(self, path):
+        if self.closed or path in self.futures:
+            return
+        future = self.executor.submit(self.thumbnails.get, path, self.size)
+        future.add_done_callback(lambda future: self.results.put((path, future)))
+        self.futures[path] = future
+        self.schedule()
+    
+    def schedule(self):
+        if self.after_id is None and not self.closed:
+            self.after_id = self.widget.after(self.interval, self.deliver)
+    
+    def deliver(self):
+        self.after_id = None
+        if self.closed:
+            return
+        while True:
+            try:
+                path, future = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if self.futures.get(path) is not future:
+                continue
+            del self.futures[path]
+            if future.cancelled():
+                continue
+            
+            error = future.exception()
+            image = None if error else future.result()
+            if image is not None:
+                self.images[path] = image
+            callback = self.callbacks.pop(path, None)
+            if callback:
+                callback(image, error)
+        
+        if self.futures:
+            self.schedule()
+    
+    def close(self):
+        self.closed = True
+        if self.after_id:
+            self.widget.after_cancel(self.after_id)
+            self.after_id = None
+        self.callbacks.clear()
+        self.executor.shutdown(wait=False, cancel_futures=True)
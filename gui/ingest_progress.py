@@ -0,0 +1,44 @@
+import tkinter as tk
+from tkinter import ttk
+
+POLL_INTERVAL_MS = 50
+
+class IngestProgress:
+    def __init__(self, parent):
+        self.label = ttk.Label(parent)
+        self.bar = ttk.Progressbar(parent, length=150, mode="determinate")
+        self.futures = []
+        self.on_done = None
+        self.after_id = None
+    
+    def wait(self, futures, on_done):
+        self.cancel()
+        self.futures = futures
+        self.on_done = on_done
+        if futures:
+            self.bar.configure(maximum=len(futures), value=0)
+            self.label.pack(side=tk.LEFT, padx=5)
+            self.bar.pack(side=tk.LEFT, padx=5)
+        self.poll()
+    
+    def poll(self):
+        self.after_id = None
+        done = sum(future.done() for future in self.futures)
+        self.label.config(text=f"Processing images {done} / {len(self.futures)}")
+        self.bar.configure(value=done)
+        if done < len(self.futures):
+            self.after_id = self.label.after(POLL_INTERVAL_MS, self.poll)
+            return
+        
+        self.hide()
+        self.on_done()
+    
+    def hide(self):
+        self.label.pack_forget()
+        self.bar.pack_forget()
+    
+    def cancel(self):
+        if self.after_id:
+            self.label.after_cancel(self.after_id)
+            self.after_id = None
+        self.hide()
@@ -0,0 +1,33 @@
+import tkinter as tk
+from tkinter import ttk
+
+class LoadStatus:
+    def __init__(self, parent, on_cancel):
+        self.text = tk.StringVar()
+        self.label = ttk.Label(parent, textvariable=self.text)
+        self.label.pack(side=tk.RIGHT, padx=5)
+        self.cancel_button = ttk.Button(parent, text="Cancel", command=on_cancel)
+        self.cancellable = False
+    
+    def busy(self, text="Loading..."):
+        self.text.set(text)
+        self.show_cancel(True)
+    
+    def idle(self, text):
+        self.text.set(text)
+        self.show_cancel(False)
+    
+    def progress(self, loaded, total, loading):
+        if loading:
+            self.busy(f"Loading {loaded:,} of {total:,} rows...")
+        elif loaded < total:
+            self.idle(f"Showing {loaded:,} of {total:,} rows")
+        else:
+            self.idle(f"{total:,} rows")
+    
+    def show_cancel(self, visible):
+        if visible and not self.cancellable:
+            self.cancel_button.pack(side=tk.RIGHT, padx=2)
+        elif not visible and self.cancellable:
+            self.cancel_button.pack_forget()
+        self.cancellable = visible
@@ -3,11 +3,18 @@ from tkinter import ttk, messagebox
 from gui.materials_tab import MaterialsTab
 from gui.boxes_tab import BoxesTab
 from gui.projects_tab import ProjectsTab
+from gui.change_monitor import ChangeMonitor
+from gui.async_database import AsyncInventoryDatabase
+from gui.photo_cache import PhotoCache
+from thumbnails import ThumbnailCache
+from image_ingest import ImageIngestor
+from image_store import ImageStore
 
 class MainWindow:
-    def __init__(self, root, db):
+    def __init__(self, root, db, store=None):
         self.root = root
         self.db = db
+        self.store = store or ImageStore()
         
         self.root.title("Scrap Inventory Genie")
         self.root.geometry("1200x800")
@@ -46,13 +53,26 @@ class MainWindow:
         self.notebook = ttk.Notebook(self.root)
         self.notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
-        self.materials_tab = MaterialsTab(self.notebook, self.db)
-        self.boxes_tab = BoxesTab(self.notebook, self.db, self.materials_tab)
-        self.projects_tab = ProjectsTab(self.notebook, self.db, self.materials_tab)
+        self.adb = AsyncInventoryDatabase(self.root, self.db)
+        self.monitor = ChangeMonitor(self.root, self.db, self.adb)
+        self.thumbnails = ThumbnailCache()
+        self.photos = PhotoCache()
+        self.ingestor = ImageIngestor(self.store, self.thumbnails)
+        self.materials_tab = MaterialsTab(self.notebook, self.db, self.adb, self.monitor, self.thumbnails, self.photos,
+                                          self.ingestor)
+        self.boxes_tab = BoxesTab(self.notebook, self.db, self.adb, self.materials_tab, self.monitor)
+        self.projects_tab = ProjectsTab(self.notebook, self.db, self.adb, self.materials_tab, self.monitor)
         
         self.notebook.add(self.materials_tab.frame, text="Materials")
         self.notebook.add(self.boxes_tab.frame, text="Boxes")
         self.notebook.add(self.projects_tab.frame, text="Projects")
+        
+        self.monitor.start()
+    
+    def close(self):
+        self.monitor.stop()
+        self.adb.close()
+        self.ingestor.close()
     
     def show_about(self):
         messagebox.showinfo(
@@ -1,22 +1,29 @@
 import tkinter as tk
 from tkinter import ttk
-from PIL import Image, ImageTk
+from PIL import ImageTk
 import os
+from thumbnails import THUMBNAIL_SIZES
+from gui.image_prefetcher import ImagePrefetcher
 
 class MaterialDetailDialog:
-    def __init__(self, parent, db, material_id):
+    def __init__(self, parent, db, material_id, thumbnails, photos):
         self.parent = parent
         self.db = db
         self.material_id = material_id
+        self.thumbnails = thumbnails
+        self.photos = photos
+        self.size = THUMBNAIL_SIZES['material']
         self.current_image_index = 0
         self.images = []
-        self.photo_images = []
         
         self.dialog = tk.Toplevel(parent)
         self.dialog.title("Material Details")
         self.dialog.geometry("800x700")
         self.dialog.transient(parent)
         
+        self.prefetcher = ImagePrefetcher(self.dialog, thumbnails, self.size)
+        self.dialog.bind("<Destroy>", lambda e: self.prefetcher.close() if e.widget is self.dialog else None)
+        
         self.create_widgets()
         self.load_material_data()
         
@@ -127,29 +134,34 @@ class MaterialDetailDialog:
         
         image_path = self.images[self.current_image_index]['image_path']
         
-        if os.path.exists(image_path):
-            try:
-                img = Image.open(image_path)
-                
-                max_width = 760
-                max_height = 400
-                img.thumbnail((max_width, max_height), Image.Resampling.LANCZOS)
-                
-                photo = ImageTk.PhotoImage(img)
-                self.photo_images.append(photo)
-                
-                self.image_label.config(image=photo, text="")
-                self.image_label.image = photo
-            except Exception as e:
-                self.image_label.config(text=f"Error loading image: {str(e)}")
+        photo = self.photos.get(image_path, self.size)
+        if photo is not None:
+            self.image_label.config(image=photo, text="")
+            self.image_label.image = photo
+        elif os.path.exists(image_path):
+            self.image_label.config(image="", text="Loading...")
+            self.prefetcher.load(image_path, lambda img, error: self.show_image(image_path, img, error))
         else:
             self.image_label.config(text=f"Image not found: {image_path}")
+        self.prefetcher.prefetch([image['image_path'] for image in self.images], self.current_image_index)
         
         self.image_counter.config(text=f"{self.current_image_index + 1} / {len(self.images)}")
         
         self.prev_btn.config(state=tk.NORMAL if self.current_image_index > 0 else tk.DISABLED)
         self.next_btn.config(state=tk.NORMAL if self.current_image_index < len(self.images) - 1 else tk.DISABLED)
     
+    def show_image(self, image_path, img, error):
+        if image_path != self.images[self.current_image_index]['image_path']:
+            return
+        if error is not None:
+            self.image_label.config(image="", text=f"Error loading image: {str(error)}")
+            return
+        
+        photo = self.photos.put(image_path, self.size, ImageTk.PhotoImage(img))
+        
+        self.image_label.config(image=photo, text="")
+        self.image_label.image = photo
+    
     def prev_image(self):
         if self.current_image_index > 0:
             self.current_image_index -= 1
@@ -7,16 +7,51 @@ from datetime import datetime
 from gui.add_material_dialog import AddMaterialDialog
 from gui.bulk_add_dialog import BulkAddDialog
 from gui.material_detail_dialog import MaterialDetailDialog
+from gui.tree_sync import SortedTree
+from gui.virtual_tree import VirtualTree
+from gui.load_status import LoadStatus
+from gui.search_cache import SearchCache
+from database import material_sort_value
+
+INCREMENTAL_LIMIT = 1000
+VIRTUAL_THRESHOLD = 5000
+SEARCH_DELAY_MS = 300
+
+SORT_COLUMNS = {
+    "ID": 'id',
+    "Name": 'name',
+    "Brand": 'brand',
+    "Type": 'material_type',
+    "Dimensions": 'area',
+    "Quantity": 'quantity',
+    "Color": 'color',
+    "Box": 'box_name',
+    "Status": 'is_used',
+}
 
 class MaterialsTab:
-    def __init__(self, parent, db):
+    def __init__(self, parent, db, adb, monitor, thumbnails, photos, ingestor):
         self.parent = parent
         self.db = db
+        self.adb = adb
+        self.monitor = monitor
+        self.thumbnails = thumbnails
+        self.photos = photos
+        self.ingestor = ingestor
         self.frame = ttk.Frame(parent)
-        self.current_materials = []
+        self.search_text = {}
+        self.search_filters = {}
+        self.order_by = None
+        self.descending = False
+        self.search_cache = SearchCache(db.fts_enabled)
+        self.search_after_id = None
         
         self.create_widgets()
+        self.rows = SortedTree(self.tree, self.row_key, self.material_values, on_progress=self.status.progress)
+        self.virtual = VirtualTree(self.tree, self.scrollbar, self.material_values, self.load_anchors, self.load_page,
+                                   on_progress=self.status.progress)
         self.load_materials()
+        monitor.subscribe(self.apply_changes)
     
     def create_widgets(self):
         toolbar = ttk.Frame(self.frame)
@@ -29,6 +64,7 @@ class MaterialsTab:
         ttk.Button(toolbar, text="Mark as Used", command=self.mark_used).pack(side=tk.LEFT, padx=2)
         ttk.Button(toolbar, text="View Details", command=self.view_details).pack(side=tk.LEFT, padx=2)
         ttk.Button(toolbar, text="Refresh", command=self.load_materials).pack(side=tk.LEFT, padx=2)
+        self.status = LoadStatus(toolbar, self.cancel_load)
         
         search_frame = ttk.LabelFrame(self.frame, text="Search & Filter", padding=10)
         search_frame.pack(fill=tk.X, padx=5, pady=5)
@@ -55,30 +91,38 @@ class MaterialsTab:
         row2 = ttk.Frame(search_frame)
         row2.pack(fill=tk.X, pady=2)
         
-        ttk.Label(row2, text="Width (cm):").pack(side=tk.LEFT, padx=2)
+        ttk.Label(row2, text="Width:").pack(side=tk.LEFT, padx=2)
         self.search_min_width = ttk.Entry(row2, width=8)
         self.search_min_width.pack(side=tk.LEFT, padx=2)
         ttk.Label(row2, text="to").pack(side=tk.LEFT, padx=2)
         self.search_max_width = ttk.Entry(row2, width=8)
         self.search_max_width.pack(side=tk.LEFT, padx=2)
         
-        ttk.Label(row2, text="Height (cm):").pack(side=tk.LEFT, padx=2)
+        ttk.Label(row2, text="Height:").pack(side=tk.LEFT, padx=2)
         self.search_min_height = ttk.Entry(row2, width=8)
         self.search_min_height.pack(side=tk.LEFT, padx=2)
         ttk.Label(row2, text="to").pack(side=tk.LEFT, padx=2)
         self.search_max_height = ttk.Entry(row2, width=8)
         self.search_max_height.pack(side=tk.LEFT, padx=2)
         
+        self.search_unit_var = tk.StringVar(value="cm")
+        unit_combo = ttk.Combobox(row2, textvariable=self.search_unit_var, width=5, state="readonly")
+        unit_combo['values'] = ["cm", "mm", "in", "m"]
+        unit_combo.pack(side=tk.LEFT, padx=2)
+        
         self.include_used_var = tk.BooleanVar(value=True)
         ttk.Checkbutton(row2, text="Include Used", variable=self.include_used_var).pack(side=tk.LEFT, padx=10)
         
         ttk.Button(row2, text="Search", command=self.search_materials).pack(side=tk.LEFT, padx=5)
         ttk.Button(row2, text="Clear", command=self.clear_search).pack(side=tk.LEFT, padx=2)
         
+        for entry in (self.search_name, self.search_brand, self.search_type, self.search_color):
+            entry.bind("<KeyRelease>", lambda e: self.schedule_search())
+        
         list_frame = ttk.Frame(self.frame)
         list_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         
-        columns = ("ID", "Name", "Brand", "Type", "Dimensions", "Quantity", "Color", "Box", "Status")
+        columns = tuple(SORT_COLUMNS)
         self.tree = ttk.Treeview(list_frame, columns=columns, show="tree headings", selectmode="browse")
         
         self.tree.heading("#0", text="")
@@ -97,45 +141,137 @@ class MaterialsTab:
             else:
                 self.tree.column(col, width=100)
         
-        scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self.scrollbar.set)
         
         self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
         self.tree.bind("<Double-1>", lambda e: self.view_details())
     
     def load_materials(self):
-        self.tree.delete(*self.tree.get_children())
-        self.current_materials = self.db.get_materials()
-        
-        for material in self.current_materials:
-            box_name = ""
-            if material['box_id']:
-                box = self.db.get_box(material['box_id'])
-                if box:
-                    box_name = box['name']
-            
-            dimensions = f"{material['width']}x{material['height']}"
-            if material['depth']:
-                dimensions += f"x{material['depth']}"
-            dimensions += f" {material['unit']}"
-            
-            status = "Used" if material['is_used'] else "Available"
-            
-            self.tree.insert("", tk.END, values=(
-                material['id'],
-                material['name'],
-                material['brand'] or "",
-                material['material_type'] or "",
-                dimensions,
-                material['quantity'],
-                material['color'] or "",
-                box_name,
-                status
-            ))
+        self.search_text = {}
+        self.search_filters = {}
+        self.reload()
+    
+    def reload(self):
+        self.status.busy()
+        if any(self.search_text.values()):
+            text, filters, order = dict(self.search_text), dict(self.search_filters), (self.order_by, self.descending)
+            materials = self.search_cache.get(text, filters, order)
+            if materials is not None:
+                self.adb.cancel('materials')
+                self.show_materials(materials, None)
+            else:
+                self.load_anchors(lambda result: self.show_anchors(result, (text, filters, order)), key='materials')
+        else:
+            self.load_anchors(self.show_anchors, key='materials')
+    
+    def page_filters(self):
+        return dict(self.search_filters, **self.db.fulltext_filters(**self.search_text))
+    
+    def load_anchors(self, callback, key=None):
+        self.adb.submit('get_material_page_anchors', self.page_filters(), self.order_by or "name",
+                        self.descending, page_size=self.virtual.page_size, callback=callback, key=key)
+    
+    def load_page(self, page_size, after, callback):
+        self.adb.submit('get_materials_page', self.page_filters(), self.order_by or "name", self.descending,
+                        page_size=page_size, after=after, callback=lambda result: callback(result[0]))
     
-    def search_materials(self):
+    def show_anchors(self, result, search=None):
+        total, anchors = result
+        if total > VIRTUAL_THRESHOLD:
+            self.rows.reset([])
+            self.virtual.show(total, anchors)
+        elif search:
+            self.request_materials(lambda materials: self.show_search_results(*search, materials), key='materials')
+        else:
+            self.request_materials(lambda materials: self.show_materials(materials, self.row_key), key='materials')
+    
+    def request_materials(self, callback, key=None, **extra):
+        search_text = dict(self.search_text)
+        filters = dict(self.search_filters, **extra)
+        if any(search_text.values()):
+            self.adb.submit('search_materials_fulltext', order_by=self.order_by, descending=self.descending,
+                            callback=callback, key=key, **search_text, **filters)
+        else:
+            self.adb.submit('get_materials_with_box', filters, self.order_by or "name", self.descending,
+                            callback=callback, key=key)
+    
+    def show_search_results(self, text, filters, order, materials):
+        self.search_cache.put(text, filters, order, materials)
+        self.show_materials(materials, None)
+    
+    def cancel_load(self):
+        self.adb.cancel('materials')
+        if self.rows.loading:
+            self.rows.cancel()
+        else:
+            self.status.idle("Load cancelled")
+    
+    def show_materials(self, materials, sort_key):
+        self.virtual.detach()
+        if self.order_by is not None:
+            sort_key = self.row_key
+        self.rows.sort_key = sort_key
+        self.rows.descending = self.descending if sort_key else False
+        self.rows.reset(materials)
+    
+    def apply_changes(self, changes):
+        changed = (changes or {}).get('materials', {})
+        if changes is None or changed:
+            self.search_cache.clear()
+        if self.virtual.active:
+            if changes is None or changed:
+                self.virtual.refresh()
+            return
+        if changes is None or len(changed) > INCREMENTAL_LIMIT:
+            self.reload()
+            return
+        if not changed:
+            return
+        
+        self.request_materials(lambda rows: self.apply_rows(changed, rows), ids=list(changed))
+    
+    def apply_rows(self, changed, rows):
+        matching = {row['id'] for row in rows}
+        for material_id in changed:
+            if material_id not in matching:
+                self.rows.remove(material_id)
+        for row in rows:
+            self.rows.upsert(row)
+        self.rows.report(False)
+    
+    def row_key(self, material):
+        return material_sort_value(material, self.order_by or "name")
+    
+    def material_values(self, material):
+        dimensions = f"{material['width']}x{material['height']}"
+        if material['depth']:
+            dimensions += f"x{material['depth']}"
+        dimensions += f" {material['unit']}"
+        
+        status = "Used" if material['is_used'] else "Available"
+        
+        return (
+            material['id'],
+            material['name'],
+            material['brand'] or "",
+            material['material_type'] or "",
+            dimensions,
+            material['quantity'],
+            material['color'] or "",
+            material['box_name'] or "",
+            status
+        )
+    
+    def schedule_search(self):
+        if self.search_after_id:
+            self.frame.after_cancel(self.search_after_id)
+        self.search_after_id = self.frame.after(SEARCH_DELAY_MS, lambda: self.search_materials(live=True))
+    
+    def search_materials(self, live=False):
+        self.search_after_id = None
         name = self.search_name.get().strip()
         brand = self.search_brand.get().strip()
         material_type = self.search_type.get().strip()
@@ -156,50 +292,32 @@ class MaterialsTab:
             if self.search_max_height.get().strip():
                 max_height = float(self.search_max_height.get())
         except ValueError:
-            messagebox.showerror("Error", "Invalid dimension values")
+            if not live:
+                messagebox.showerror("Error", "Invalid dimension values")
             return
         
         include_used = self.include_used_var.get()
         
-        self.current_materials = self.db.search_materials(
-            name=name,
-            brand=brand,
-            material_type=material_type,
-            color=color,
-            min_width=min_width,
-            max_width=max_width,
-            min_height=min_height,
-            max_height=max_height,
-            include_used=include_used
-        )
-        
-        self.tree.delete(*self.tree.get_children())
-        
-        for material in self.current_materials:
-            box_name = ""
-            if material['box_id']:
-                box = self.db.get_box(material['box_id'])
-                if box:
-                    box_name = box['name']
-            
-            dimensions = f"{material['width']}x{material['height']}"
-            if material['depth']:
-                dimensions += f"x{material['depth']}"
-            dimensions += f" {material['unit']}"
-            
-            status = "Used" if material['is_used'] else "Available"
-            
-            self.tree.insert("", tk.END, values=(
-                material['id'],
-                material['name'],
-                material['brand'] or "",
-                material['material_type'] or "",
-                dimensions,
-                material['quantity'],
-                material['color'] or "",
-                box_name,
-                status
-            ))
+        filters = {
+            'min_width': min_width,
+            'max_width': max_width,
+            'min_height': min_height,
+            'max_height': max_height,
+            'include_used': include_used,
+            'unit': self.search_unit_var.get()
+        }
+        
+        search_text = {
+            'name': name,
+            'brand': brand,
+            'material_type': material_type,
+            'color': color
+        }
+        if live and search_text == self.search_text and filters == self.search_filters:
+            return
+        self.search_text = search_text
+        self.search_filters = filters
+        self.reload()
     
     def clear_search(self):
         self.search_name.delete(0, tk.END)
@@ -210,84 +328,90 @@ class MaterialsTab:
         self.search_max_width.delete(0, tk.END)
         self.search_min_height.delete(0, tk.END)
         self.search_max_height.delete(0, tk.END)
+        self.search_unit_var.set("cm")
         self.include_used_var.set(True)
         self.load_materials()
     
     def add_material(self):
-        dialog = AddMaterialDialog(self.frame, self.db)
+        dialog = AddMaterialDialog(self.frame, self.db, self.ingestor)
         if dialog.result:
-            self.load_materials()
+            self.monitor.poll()
     
     def bulk_add(self):
         dialog = BulkAddDialog(self.frame, self.db)
         if dialog.result:
-            self.load_materials()
+            self.monitor.poll()
     
     def edit_material(self):
-        selection = self.tree.selection()
-        if not selection:
+        material_id = self.get_selected_material_id()
+        if material_id is None:
             messagebox.showwarning("Warning", "Please select a material to edit")
             return
         
-        item = self.tree.item(selection[0])
-        material_id = item['values'][0]
-        
-        dialog = AddMaterialDialog(self.frame, self.db, material_id)
+        dialog = AddMaterialDialog(self.frame, self.db, self.ingestor, material_id)
         if dialog.result:
-            self.load_materials()
+            self.monitor.poll()
     
     def delete_material(self):
-        selection = self.tree.selection()
-        if not selection:
+        material_id = self.get_selected_material_id()
+        if material_id is None:
             messagebox.showwarning("Warning", "Please select a material to delete")
             return
         
-        item = self.tree.item(selection[0])
-        material_id = item['values'][0]
-        material_name = item['values'][1]
+        material_name = self.db.get_material(material_id)['name']
         
         if messagebox.askyesno("Confirm Delete", f"Are you sure you want to delete '{material_name}'?"):
+            images = self.db.get_material_images(material_id)
             self.db.delete_material(material_id)
-            self.load_materials()
+            self.ingestor.store.release(self.db, [image['image_path'] for image in images])
+            self.virtual.selected_id = None
+            self.monitor.poll()
             messagebox.showinfo("Success", "Material deleted successfully")
     
     def mark_used(self):
-        selection = self.tree.selection()
-        if not selection:
+        material_id = self.get_selected_material_id()
+        if material_id is None:
             messagebox.showwarning("Warning", "Please select a material to mark as used")
             return
         
-        item = self.tree.item(selection[0])
-        material_id = item['values'][0]
-        material_name = item['values'][1]
-        current_status = item['values'][8]
+        material = self.db.get_material(material_id)
+        material_name = material['name']
         
-        if current_status == "Used":
+        if material['is_used']:
             if messagebox.askyesno("Mark as Available", f"Mark '{material_name}' as available again?"):
                 self.db.mark_material_used(material_id, False)
-                self.load_materials()
+                self.monitor.poll()
                 messagebox.showinfo("Success", "Material marked as available")
         else:
             if messagebox.askyesno("Mark as Used", f"Mark '{material_name}' as used?"):
                 self.db.mark_material_used(material_id, True)
-                self.load_materials()
+                self.monitor.poll()
                 messagebox.showinfo("Success", "Material marked as used")
     
     def view_details(self):
-        selection = self.tree.selection()
-        if not selection:
+        material_id = self.get_selected_material_id()
+        if material_id is None:
             messagebox.showwarning("Warning", "Please select a material to view")
             return
         
-        item = self.tree.item(selection[0])
-        material_id = item['values'][0]
-        
-        MaterialDetailDialog(self.frame, self.db, material_id)
+        MaterialDetailDialog(self.frame, self.db, material_id, self.thumbnails, self.photos)
     
     def sort_by_column(self, col):
-        pass
+        order_by = SORT_COLUMNS[col]
+        if order_by == self.order_by:
+            self.descending = not self.descending
+        else:
+            self.order_by = order_by
+            self.descending = False
+        
+        for column, key in SORT_COLUMNS.items():
+            arrow = (" \u25bc" if self.descending else " \u25b2") if key == self.order_by else ""
+            self.tree.heading(column, text=column + arrow)
+        self.reload()
     
     def get_selected_material_id(self):
+        if self.virtual.active:
+            return self.virtual.selected_id
         selection = self.tree.selection()
         if selection:
             item = self.tree.item(selection[0])
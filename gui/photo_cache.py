@@ -0,0 +1,26 @@
+from cache import LRUCache
+
+PHOTO_CACHE_BYTES = 64 * 1024 * 1024
+BYTES_PER_PIXEL = 4
+
+class PhotoCache:
+    def __init__(self, max_bytes=PHOTO_CACHE_BYTES):
+        self.photos = LRUCache(max_bytes, weigh=self.photo_bytes)
+    
+    def photo_bytes(self, photo):
+        return photo.width() * photo.height() * BYTES_PER_PIXEL
+    
+    def get(self, path, size):
+        return self.photos.get((path, tuple(size)))
+    
+    def put(self, path, size, photo):
+        self.photos.put((path, tuple(size)), photo)
+        return photo
+    
+    def clear(self):
+        self.photos.clear()
+    
+    def stats(self):
+        stats = self.photos.stats()
+        return {'hits': stats['hits'], 'misses': stats['misses'], 'evictions': stats['evictions'],
+                'photos': stats['size'], 'bytes': stats['weight'], 'max_bytes': stats['maxsize']}
@@ -2,17 +2,23 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 from gui.add_project_dialog import AddProjectDialog
 from gui.project_detail_dialog import ProjectDetailDialog
+from gui.tree_sync import SortedTree
+from gui.load_status import LoadStatus
 
 class ProjectsTab:
-    def __init__(self, parent, db, materials_tab):
+    def __init__(self, parent, db, adb, materials_tab, monitor):
         self.parent = parent
         self.db = db
+        self.adb = adb
         self.materials_tab = materials_tab
+        self.monitor = monitor
         self.frame = ttk.Frame(parent)
-        self.current_projects = []
         
         self.create_widgets()
+        self.rows = SortedTree(self.tree, lambda project: project['created_at'] or "", self.project_values,
+                               descending=True, on_progress=self.status.progress)
         self.load_projects()
+        monitor.subscribe(self.apply_changes)
     
     def create_widgets(self):
         toolbar = ttk.Frame(self.frame)
@@ -24,6 +30,7 @@ class ProjectsTab:
         ttk.Button(toolbar, text="View Details", command=self.view_details).pack(side=tk.LEFT, padx=2)
         ttk.Button(toolbar, text="Mark Complete", command=self.mark_complete).pack(side=tk.LEFT, padx=2)
         ttk.Button(toolbar, text="Refresh", command=self.load_projects).pack(side=tk.LEFT, padx=2)
+        self.status = LoadStatus(toolbar, self.cancel_load)
         
         list_frame = ttk.Frame(self.frame)
         list_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
@@ -56,32 +63,40 @@ class ProjectsTab:
         self.tree.bind("<Double-1>", lambda e: self.view_details())
     
     def load_projects(self):
-        self.tree.delete(*self.tree.get_children())
-        self.current_projects = self.db.get_projects()
-        
-        for project in self.current_projects:
-            materials = self.db.get_project_materials(project['id'])
-            material_count = len(materials)
-            
-            description = project['description'][:50] + "..." if project['description'] and len(project['description']) > 50 else (project['description'] or "")
-            
-            status = "Completed" if project['completed_at'] else "In Progress"
-            
-            created = project['created_at'][:10] if project['created_at'] else ""
-            
-            self.tree.insert("", tk.END, values=(
-                project['id'],
-                project['name'],
-                description,
-                material_count,
-                created,
-                status
-            ))
+        self.status.busy()
+        self.adb.submit('get_project_summaries', callback=self.rows.reset, key='projects')
+    
+    def cancel_load(self):
+        self.adb.cancel('projects')
+        if self.rows.loading:
+            self.rows.cancel()
+        else:
+            self.status.idle("Load cancelled")
+    
+    def apply_changes(self, changes):
+        if changes is None or 'projects' in changes or 'project_materials' in changes:
+            self.adb.submit('get_project_summaries', callback=self.rows.sync, key='projects')
+    
+    def project_values(self, project):
+        description = project['description'][:50] + "..." if project['description'] and len(project['description']) > 50 else (project['description'] or "")
+        
+        status = "Completed" if project['completed_at'] else "In Progress"
+        
+        created = project['created_at'][:10] if project['created_at'] else ""
+        
+        return (
+            project['id'],
+            project['name'],
+            description,
+            project['material_count'],
+            created,
+            status
+        )
     
     def add_project(self):
         dialog = AddProjectDialog(self.frame, self.db, self.materials_tab)
         if dialog.result:
-            self.load_projects()
+            self.monitor.poll()
     
     def edit_project(self):
         selection = self.tree.selection()
@@ -94,7 +109,7 @@ class ProjectsTab:
         
         dialog = AddProjectDialog(self.frame, self.db, self.materials_tab, project_id)
         if dialog.result:
-            self.load_projects()
+            self.monitor.poll()
     
     def delete_project(self):
         selection = self.tree.selection()
@@ -107,8 +122,10 @@ class ProjectsTab:
         project_name = item['values'][1]
         
         if messagebox.askyesno("Confirm Delete", f"Are you sure you want to delete project '{project_name}'?"):
+            images = self.db.get_project_images(project_id)
             self.db.delete_project(project_id)
-            self.load_projects()
+            self.materials_tab.ingestor.store.release(self.db, [image['image_path'] for image in images])
+            self.monitor.poll()
             messagebox.showinfo("Success", "Project deleted successfully")
     
     def view_details(self):
@@ -120,7 +137,8 @@ class ProjectsTab:
         item = self.tree.item(selection[0])
         project_id = item['values'][0]
         
-        ProjectDetailDialog(self.frame, self.db, project_id)
+        ProjectDetailDialog(self.frame, self.db, project_id, self.materials_tab.thumbnails,
+                            self.materials_tab.photos)
     
     def mark_complete(self):
         selection = self.tree.selection()
@@ -139,5 +157,5 @@ class ProjectsTab:
         
         if messagebox.askyesno("Mark Complete", f"Mark project '{project_name}' as completed?"):
             self.db.complete_project(project_id)
-            self.load_projects()
+            self.monitor.poll()
             messagebox.showinfo("Success", "Project marked as completed")
@@ -0,0 +1,73 @@
+from cache import LRUCache
+from database import DIMENSIONS, material_matches, to_millimetres
+
+SEARCH_CACHE_SIZE = 32
+TEXT_COLUMNS = ('name', 'brand', 'material_type', 'color')
+
+class SearchCache:
+    def __init__(self, fulltext=True, maxsize=SEARCH_CACHE_SIZE):
+        self.fulltext = fulltext
+        self.entries = LRUCache(maxsize)
+        self.rows = {}
+        self.refined = 0
+    
+    def key(self, text, filters, order):
+        return (tuple(sorted(text.items())), tuple(sorted(filters.items())), order)
+    
+    def get(self, text, filters, order):
+        key = self.key(text, filters, order)
+        entry = self.entries.get(key)
+        if entry is not None:
+            return [self.rows[row_id] for row_id in entry[3]]
+        
+        broader = [entry for _, entry in self.entries.items() if self.narrows(text, filters, order, entry)]
+        if not broader:
+            return None
+        base = min(broader, key=lambda entry: len(entry[3]))
+        search = dict(filters, **text)
+        rows = [self.rows[row_id] for row_id in base[3] if material_matches(self.rows[row_id], search, self.fulltext)]
+        self.refined += 1
+        self.store(key, text, filters, order, rows)
+        return rows
+    
+    def put(self, text, filters, order, rows):
+        self.store(self.key(text, filters, order), text, filters, order, rows)
+    
+    def store(self, key, text, filters, order, rows):
+        evictions = self.entries.evictions
+        self.rows.update((row['id'], row) for row in rows)
+        self.entries.put(key, (text, filters, order, tuple(row['id'] for row in rows)))
+        if self.entries.evictions != evictions:
+            self.rows = {row_id: self.rows[row_id] for _, entry in self.entries.items() for row_id in entry[3]}
+    
+    def clear(self):
+        self.entries.clear()
+        self.rows = {}
+    
+    def narrows(self, text, filters, order, entry):
+        old_text, old_filters, old_order, _ = entry
+        if order != old_order or filters.get('box_id') != old_filters.get('box_id'):
+            return False
+        if self.fulltext and order[0] is None and text != old_text:
+            return False
+        if filters.get('include_used', True) and not old_filters.get('include_used', True):
+            return False
+        for column in TEXT_COLUMNS:
+            if not text.get(column, "").startswith(old_text.get(column, "")):
+                return False
+        
+        for dimension in DIMENSIONS:
+            low, high = self.bounds(filters, dimension)
+            old_low, old_high = self.bounds(old_filters, dimension)
+            if old_low is not None and (low is None or low < old_low):
+                return False
+            if old_high is not None and (high is None or high > old_high):
+                return False
+        return True
+    
+    def bounds(self, filters, dimension):
+        unit = filters.get('unit', "cm")
+        low = filters.get(f"min_{dimension}", 0)
+        high = filters.get(f"max_{dimension}", 0)
+        return (to_millimetres(low, unit) if low > 0 else None,
+                to_millimetres(high, unit) if high > 0 else None)
@@ -0,0 +1,134 @@
+import bisect
+import tkinter as tk
+
+CHUNK_SIZE = 500
+CHUNK_DELAY_MS = 1
+
+class SortedTree:
+    def __init__(self, tree, sort_key, values, descending=False, on_progress=None, chunk_size=CHUNK_SIZE):
+        self.tree = tree
+        self.sort_key = sort_key
+        self.values = values
+        self.descending = descending
+        self.on_progress = on_progress
+        self.chunk_size = chunk_size
+        self.order = []
+        self.keys = {}
+        self.pending = []
+        self.loaded = 0
+        self.after_id = None
+    
+    def reset(self, rows):
+        self.stop_loading()
+        self.tree.delete(*self.tree.get_children())
+        if self.sort_key is None:
+            self.order = []
+            self.keys = dict.fromkeys(row['id'] for row in rows)
+        else:
+            self.order = [(self.sort_key(row), row['id']) for row in rows]
+            self.keys = {key[1]: key for key in self.order}
+            if self.descending:
+                self.order.reverse()
+        self.pending = list(rows)
+        
+        self.loaded = 0
+        self.load_chunk()
+    
+    @property
+    def loading(self):
+        return self.loaded < len(self.pending)
+    
+    def load_chunk(self, count=None):
+        self.after_id = None
+        end = self.loaded + (count or self.chunk_size)
+        for row in self.pending[self.loaded:end]:
+            self.tree.insert("", tk.END, iid=str(row['id']), values=self.values(row))
+        self.loaded = min(end, len(self.pending))
+        
+        if self.loading:
+            self.after_id = self.tree.after(CHUNK_DELAY_MS, self.load_chunk)
+        else:
+            self.pending = []
+            self.loaded = 0
+        self.report(self.loading)
+    
+    def report(self, loading):
+        if self.on_progress:
+            total = len(self.pending) if loading else len(self.keys)
+            self.on_progress(self.loaded if loading else len(self.keys), total, loading)
+    
+    def stop_loading(self):
+        if self.after_id:
+            self.tree.after_cancel(self.after_id)
+            self.after_id = None
+    
+    def finish_loading(self):
+        if self.loading:
+            self.stop_loading()
+            self.load_chunk(len(self.pending))
+    
+    def cancel(self):
+        if not self.loading:
+            return
+        self.stop_loading()
+        for row in self.pending[self.loaded:]:
+            del self.keys[row['id']]
+        self.order = [key for key in self.order if key[1] in self.keys]
+        total = len(self.pending)
+        self.pending = []
+        self.loaded = 0
+        if self.on_progress:
+            self.on_progress(len(self.keys), total, False)
+    
+    def ids(self):
+        return list(self.keys)
+    
+    def upsert(self, row):
+        self.finish_loading()
+        iid = str(row['id'])
+        values = self.values(row)
+        if self.sort_key is None:
+            if row['id'] in self.keys:
+                self.tree.item(iid, values=values)
+            else:
+                self.keys[row['id']] = None
+                self.tree.insert("", tk.END, iid=iid, values=values)
+            return
+        
+        key = (self.sort_key(row), row['id'])
+        old_key = self.keys.get(row['id'])
+        if old_key == key:
+            self.tree.item(iid, values=values)
+            return
+        
+        if old_key is not None:
+            self.order.pop(bisect.bisect_left(self.order, old_key))
+        position = bisect.bisect_left(self.order, key)
+        self.order.insert(position, key)
+        self.keys[row['id']] = key
+        index = len(self.order) - 1 - position if self.descending else position
+        
+        if old_key is None:
+            self.tree.insert("", index, iid=iid, values=values)
+        else:
+            self.tree.item(iid, values=values)
+            self.tree.detach(iid)
+            self.tree.move(iid, "", index)
+    
+    def remove(self, row_id):
+        self.finish_loading()
+        if row_id not in self.keys:
+            return
+        key = self.keys.pop(row_id)
+        if key is not None:
+            self.order.pop(bisect.bisect_left(self.order, key))
+        self.tree.delete(str(row_id))
+    
+    def sync(self, rows):
+        fresh = {row['id'] for row in rows}
+        for row_id in self.ids():
+            if row_id not in fresh:
+                self.remove(row_id)
+        for row in rows:
+            self.upsert(row)
+        self.report(False)
@@ -0,0 +1,207 @@
+import tkinter as tk
+from collections import OrderedDict
+
+PAGE_SIZE = 100
+CACHED_PAGES = 12
+ROW_HEIGHT = 20
+HEADING_HEIGHT = 25
+WHEEL_ROWS = 3
+
+class VirtualTree:
+    def __init__(self, tree, scrollbar, values, load_anchors, load_page, page_size=PAGE_SIZE,
+                 cached_pages=CACHED_PAGES, on_progress=None):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.values = values
+        self.load_anchors = load_anchors
+        self.load_page = load_page
+        self.page_size = page_size
+        self.cached_pages = cached_pages
+        self.on_progress = on_progress
+        self.active = False
+        self.total = 0
+        self.anchors = []
+        self.pages = OrderedDict()
+        self.stale_pages = {}
+        self.requested = set()
+        self.generation = 0
+        self.top = 0
+        self.window_ids = []
+        self.selected_id = None
+        self.select_index = None
+        self.bindings = {
+            "<MouseWheel>": self.on_wheel,
+            "<Button-4>": lambda e: self.scroll_rows(-WHEEL_ROWS),
+            "<Button-5>": lambda e: self.scroll_rows(WHEEL_ROWS),
+            "<Configure>": lambda e: self.render(),
+            "<<TreeviewSelect>>": self.on_select,
+            "<Up>": lambda e: self.move_selection(-1),
+            "<Down>": lambda e: self.move_selection(1),
+            "<Prior>": lambda e: self.move_selection(-self.visible_rows()),
+            "<Next>": lambda e: self.move_selection(self.visible_rows()),
+            "<Home>": lambda e: self.move_selection(-self.total),
+            "<End>": lambda e: self.move_selection(self.total),
+        }
+    
+    def attach(self):
+        if self.active:
+            return
+        self.active = True
+        self.tree.configure(yscrollcommand="")
+        self.scrollbar.configure(command=self.on_scroll)
+        for sequence, handler in self.bindings.items():
+            self.tree.bind(sequence, handler)
+    
+    def detach(self):
+        if not self.active:
+            return
+        self.active = False
+        self.generation += 1
+        self.pages.clear()
+        self.stale_pages = {}
+        self.requested.clear()
+        for sequence in self.bindings:
+            self.tree.unbind(sequence)
+        self.scrollbar.configure(command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self.scrollbar.set)
+    
+    def show(self, total, anchors):
+        self.attach()
+        self.top = 0
+        self.selected_id = None
+        self.select_index = None
+        self.stale_pages = {}
+        self.update_anchors((total, anchors))
+    
+    def refresh(self):
+        generation = self.generation
+        self.load_anchors(lambda result: self.update_anchors(result) if generation == self.generation else None)
+    
+    def update_anchors(self, result):
+        self.total, self.anchors = result
+        self.generation += 1
+        self.stale_pages.update(self.pages)
+        self.pages = OrderedDict()
+        self.requested.clear()
+        self.top = max(0, min(self.top, self.total - self.visible_rows()))
+        if self.on_progress:
+            self.on_progress(self.total, self.total, False)
+        self.render()
+    
+    def visible_rows(self):
+        children = self.tree.get_children()
+        bbox = self.tree.bbox(children[0]) if children else None
+        heading, row_height = (bbox[1], bbox[3]) if bbox else (HEADING_HEIGHT, ROW_HEIGHT)
+        return max(1, (self.tree.winfo_height() - heading) // max(1, row_height))
+    
+    def row_at(self, index):
+        page, offset = divmod(index, self.page_size)
+        rows = self.pages.get(page)
+        if rows is None:
+            rows = self.stale_pages.get(page)
+        else:
+            self.pages.move_to_end(page)
+        if rows is not None and offset < len(rows):
+            return rows[offset]
+        return None
+    
+    def request_pages(self, first, last):
+        first = max(0, first)
+        last = min(self.total - 1, last)
+        if last < first:
+            return
+        for page in range(first // self.page_size, last // self.page_size + 1):
+            if page in self.pages or page in self.requested:
+                continue
+            self.requested.add(page)
+            after = self.anchors[page - 1] if page else None
+            generation = self.generation
+            self.load_page(self.page_size, after,
+                           lambda rows, page=page: self.page_loaded(generation, page, rows))
+    
+    def page_loaded(self, generation, page, rows):
+        if generation != self.generation or not self.active:
+            return
+        self.requested.discard(page)
+        self.pages[page] = rows
+        while len(self.pages) > self.cached_pages:
+            self.pages.popitem(last=False)
+        if not self.requested:
+            self.stale_pages = {}
+        self.render()
+    
+    def render(self):
+        if not self.active:
+            return
+        visible = self.visible_rows()
+        self.request_pages(self.top, self.top + visible - 1)
+        self.request_pages(self.top - visible, self.top + 2 * visible)
+        
+        if self.select_index is not None and self.row_at(self.select_index) is not None:
+            self.selected_id = self.row_at(self.select_index)['id']
+            self.select_index = None
+        
+        self.tree.delete(*self.tree.get_children())
+        self.window_ids = []
+        for index in range(self.top, min(self.top + visible, self.total)):
+            row = self.row_at(index)
+            if row is None:
+                self.tree.insert("", tk.END, iid=f"pending-{index}", values=("", "Loading..."))
+                self.window_ids.append(None)
+            else:
+                self.tree.insert("", tk.END, iid=str(row['id']), values=self.values(row))
+                self.window_ids.append(row['id'])
+        
+        if self.selected_id in self.window_ids:
+            self.tree.selection_set(str(self.selected_id))
+        
+        if self.total:
+            self.scrollbar.set(self.top / self.total, min(1.0, (self.top + visible) / self.total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+    
+    def scroll_to(self, top):
+        top = max(0, min(int(top), self.total - self.visible_rows()))
+        if top != self.top:
+            self.top = top
+            self.render()
+    
+    def scroll_rows(self, rows):
+        self.scroll_to(self.top + rows)
+        return "break"
+    
+    def on_scroll(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(float(amount) * self.total)
+        elif unit == "pages":
+            self.scroll_rows(int(amount) * self.visible_rows())
+        else:
+            self.scroll_rows(int(amount))
+    
+    def on_wheel(self, event):
+        return self.scroll_rows(-WHEEL_ROWS if event.delta > 0 else WHEEL_ROWS)
+    
+    def on_select(self, event):
+        selection = self.tree.selection()
+        if selection and not selection[0].startswith("pending-"):
+            self.selected_id = int(selection[0])
+    
+    def move_selection(self, step):
+        if not self.total:
+            return "break"
+        if self.selected_id in self.window_ids:
+            index = self.top + self.window_ids.index(self.selected_id) + step
+        else:
+            index = self.top
+        index = max(0, min(index, self.total - 1))
+        
+        visible = self.visible_rows()
+        if index < self.top:
+            self.top = index
+        elif index >= self.top + visible:
+            self.top = index - visible + 1
+        self.select_index = index
+        self.render()
+        if self.selected_id in self.window_ids:
+            self.tree.focus(str(self.selected_id))
+        return "break"
@@ -0,0 +1,114 @@
+import os
+import tempfile
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Iterable, List, Optional, Tuple
+from PIL import ExifTags, Image, ImageOps, UnidentifiedImageError
+from image_store import ImageStore
+from thumbnails import ThumbnailCache
+
+INGEST_MAX_EDGE = 2560
+INGEST_QUALITY = 85
+INGEST_FORMAT = "JPEG"
+
+OUTPUT_EXTENSIONS = {'JPEG': ".jpg", 'WEBP': ".webp", 'PNG': ".png"}
+
+def ingest_image(source: str, store_root: str, max_edge: Optional[int] = INGEST_MAX_EDGE,
+                 quality: int = INGEST_QUALITY, image_format: str = INGEST_FORMAT,
+                 thumbnail_dir: Optional[str] = None, thumbnail_bytes: int = 0,
+                 thumbnail_sizes: Iterable[Tuple[int, int]] = ()) -> Tuple[str, bool]:
+    path, created = normalize_into_store(ImageStore(store_root), source, max_edge, quality, image_format)
+    if thumbnail_dir and thumbnail_sizes:
+        ThumbnailCache(thumbnail_dir, thumbnail_bytes).warm(path, thumbnail_sizes)
+    return path, created
+
+def normalize_into_store(store: ImageStore, source: str, max_edge: Optional[int], quality: int,
+                         image_format: str) -> Tuple[str, bool]:
+    try:
+        original = Image.open(source)
+    except UnidentifiedImageError:
+        return store.add(source)
+    
+    with original:
+        if getattr(original, "is_animated", False):
+            return store.add(source)
+        
+        oversized = bool(max_edge) and max(original.size) > max_edge
+        if oversized:
+            original.draft("RGB", (max_edge, max_edge))
+        rotated = original.getexif().get(ExifTags.Base.Orientation, 1) != 1
+        image = ImageOps.exif_transpose(original) if rotated else original
+        if max_edge and max(image.size) > max_edge:
+            image.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+        
+        has_alpha = image.mode in ("RGBA", "LA") or "transparency" in image.info
+        output_format = "PNG" if has_alpha and image_format == "JPEG" else image_format
+        if original.format == output_format and not oversized and not rotated:
+            return store.add(source)
+        
+        if output_format == "JPEG":
+            image = image.convert("RGB")
+        elif image.mode not in ("RGB", "RGBA", "L", "LA"):
+            image = image.convert("RGBA" if has_alpha else "RGB")
+        options = {} if output_format == "PNG" else {'quality': quality}
+        return save_to_store(store, image, output_format, **options)
+
+def save_to_store(store: ImageStore, image: Image.Image, image_format: str, **options) -> Tuple[str, bool]:
+    os.makedirs(store.root, exist_ok=True)
+    descriptor, temp_path = tempfile.mkstemp(dir=store.root, suffix=OUTPUT_EXTENSIONS[image_format])
+    try:
+        with os.fdopen(descriptor, "wb") as output:
+            image.save(output, image_format, **options)
+        return store.add(temp_path, move=True)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+class ImageIngestor:
+    def __init__(self, store: ImageStore, thumbnails: Optional[ThumbnailCache] = None, max_edge: Optional[int] = INGEST_MAX_EDGE,
+                 quality: int = INGEST_QUALITY, image_format: str = INGEST_FORMAT, workers: Optional[int] = None):
+        if image_format not in OUTPUT_EXTENSIONS:
+            raise ValueError(f"Unsupported image format: {image_format!r}")
+        self.store = store
+        self.thumbnails = thumbnails
+        self.max_edge = max_edge
+        self.quality = quality
+        self.image_format = image_format
+        self.workers = workers
+        self._executor = None
+    
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+    
+    def submit(self, sources: List[str], thumbnail_sizes: Iterable[Tuple[int, int]] = ()) -> List[Future]:
+        thumbnail_dir = self.thumbnails.directory if self.thumbnails else None
+        thumbnail_bytes = self.thumbnails.max_bytes if self.thumbnails else 0
+        return [
+            self.executor.submit(ingest_image, source, self.store.root, self.max_edge, self.quality,
+                                 self.image_format, thumbnail_dir, thumbnail_bytes, list(thumbnail_sizes))
+            for source in sources
+        ]
+    
+    def discard(self, futures: List[Future]):
+        for future in futures:
+            if not future.cancel():
+                future.add_done_callback(self._remove_result)
+    
+    def _remove_result(self, future: Future):
+        if future.cancelled() or future.exception() is not None:
+            return
+        path, created = future.result()
+        if not created:
+            return
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
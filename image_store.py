@@ -0,0 +1,115 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from typing import Dict, Iterable, Optional, Tuple
+from PIL import Image
+
+STORE_DIR = os.path.join("images", "store")
+LEGACY_DIRS = [os.path.join("images", "materials"), os.path.join("images", "projects")]
+MIGRATION_TASK = "image_store"
+SHARD_DEPTH = 2
+SHARD_WIDTH = 2
+HASH_CHUNK_SIZE = 1024 * 1024
+
+FORMAT_EXTENSIONS = {'JPEG': ".jpg", 'PNG': ".png", 'WEBP': ".webp", 'GIF': ".gif", 'BMP': ".bmp", 'TIFF': ".tiff"}
+EXTENSION_ALIASES = {'.jpeg': ".jpg", '.jpe': ".jpg", '.jfif': ".jpg", '.tif': ".tiff"}
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as source:
+        for chunk in iter(lambda: source.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def canonical_extension(path: str) -> str:
+    try:
+        with Image.open(path) as image:
+            extension = FORMAT_EXTENSIONS.get(image.format)
+    except OSError:
+        extension = None
+    if extension:
+        return extension
+    extension = os.path.splitext(path)[1].lower()
+    return EXTENSION_ALIASES.get(extension, extension)
+
+def is_within(path: str, directory: str) -> bool:
+    return os.path.abspath(path).startswith(os.path.abspath(directory) + os.sep)
+
+class ImageStore:
+    def __init__(self, root: str = STORE_DIR):
+        self.root = root
+    
+    def path_for(self, digest: str, extension: str) -> str:
+        shards = [digest[i * SHARD_WIDTH:(i + 1) * SHARD_WIDTH] for i in range(SHARD_DEPTH)]
+        return os.path.join(self.root, *shards, digest + extension)
+    
+    def find(self, digest: str) -> Optional[str]:
+        directory = os.path.dirname(self.path_for(digest, ""))
+        try:
+            names = os.listdir(directory)
+        except FileNotFoundError:
+            return None
+        for name in sorted(names):
+            if name.startswith(digest):
+                return os.path.join(directory, name)
+        return None
+    
+    def contains(self, path: str) -> bool:
+        return is_within(path, self.root)
+    
+    def add(self, path: str, move: bool = False) -> Tuple[str, bool]:
+        digest = file_digest(path)
+        target = self.find(digest)
+        if target is not None:
+            if move:
+                os.remove(path)
+            return target, False
+        
+        target = self.path_for(digest, canonical_extension(path))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if move:
+            os.replace(path, target)
+            return target, True
+        
+        descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(target), suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "wb") as output, open(path, "rb") as original:
+                shutil.copyfileobj(original, output)
+            shutil.copystat(path, temp_path)
+            os.replace(temp_path, target)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        return target, True
+    
+    def release(self, db, paths: Iterable[str]) -> int:
+        removed = 0
+        for path in set(paths):
+            if not self.contains(path) or db.count_image_references(path):
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            removed += 1
+        return removed
+    
+    def migrate(self, db, directories: Iterable[str] = LEGACY_DIRS) -> Dict[str, int]:
+        if db.task_completed(MIGRATION_TASK):
+            return {'files': 0, 'unique': 0}
+        
+        directories = list(directories)
+        relinked = {}
+        for path in db.get_image_paths():
+            if not any(is_within(path, directory) for directory in directories) or not os.path.exists(path):
+                continue
+            relinked[path] = self.add(path)[0]
+        
+        with db.transaction():
+            db.relink_images(relinked)
+            db.complete_task(MIGRATION_TASK)
+        for path in relinked:
+            os.remove(path)
+        
+        return {'files': len(relinked), 'unique': len(set(relinked.values()))}
@@ -1,22 +1,25 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import os
+from multiprocessing import freeze_support
 from database import InventoryDatabase
+from image_store import ImageStore
 from gui.main_window import MainWindow
 
 def main():
-    if not os.path.exists("images"):
-        os.makedirs("images")
-        os.makedirs("images/materials")
-        os.makedirs("images/projects")
+    store = ImageStore()
+    os.makedirs(store.root, exist_ok=True)
     
     db = InventoryDatabase()
+    store.migrate(db)
     
     root = tk.Tk()
-    app = MainWindow(root, db)
+    app = MainWindow(root, db, store)
     root.mainloop()
     
+    app.close()
     db.close()
 
 if __name__ == "__main__":
+    freeze_support()
     main()
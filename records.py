@@ -0,0 +1,85 @@
+from collections.abc import Mapping
+from typing import Dict, Sequence, Tuple
+
+def build_init(fields: Tuple[str, ...]):
+    arguments = "".join(f", {name}=None" for name in fields)
+    body = "".join(f"\n    self.{name} = {name}" for name in fields) or "\n    pass"
+    namespace = {}
+    exec(f"def __init__(self{arguments}, *_):{body}", namespace)
+    return namespace['__init__']
+
+class Record(Mapping):
+    __slots__ = ()
+    FIELDS: Tuple[str, ...] = ()
+    _variants: Dict[Tuple[str, ...], type] = {}
+    
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._variants = {}
+        if 'FIELDS' in cls.__dict__:
+            cls.__init__ = build_init(cls.FIELDS)
+    
+    @classmethod
+    def for_columns(cls, columns: Sequence[str]) -> type:
+        columns = tuple(columns)
+        if columns == cls.FIELDS:
+            return cls
+        
+        variant = cls._variants.get(columns)
+        if variant is None:
+            extra = tuple(column for column in columns if column not in cls.FIELDS)
+            variant = type(cls.__name__, (cls,), {'__slots__': extra, 'FIELDS': columns})
+            cls._variants[columns] = variant
+        return variant
+    
+    def __getitem__(self, key):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+    
+    def __setitem__(self, key, value):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        setattr(self, key, value)
+    
+    def __iter__(self):
+        return iter(self.FIELDS)
+    
+    def __len__(self):
+        return len(self.FIELDS)
+    
+    def __copy__(self):
+        return type(self)(*(getattr(self, name) for name in self.FIELDS))
+    
+    def to_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in self.FIELDS}
+    
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.FIELDS)
+        return f"{type(self).__name__}({fields})"
+
+class Box(Record):
+    FIELDS = ('id', 'name', 'location', 'description', 'created_at')
+    __slots__ = FIELDS
+
+class Material(Record):
+    FIELDS = ('id', 'box_id', 'name', 'brand', 'material_type', 'width', 'height', 'depth', 'unit',
+              'quantity', 'color', 'tutorial_url', 'notes', 'is_used', 'used_date', 'created_at',
+              'width_mm', 'height_mm', 'depth_mm', 'box_name')
+    __slots__ = FIELDS
+
+class MaterialImage(Record):
+    FIELDS = ('id', 'material_id', 'image_path', 'is_primary', 'created_at')
+    __slots__ = FIELDS
+
+class Project(Record):
+    FIELDS = ('id', 'name', 'description', 'created_at', 'completed_at')
+    __slots__ = FIELDS
+
+class ProjectImage(Record):
+    FIELDS = ('id', 'project_id', 'image_path', 'created_at')
+    __slots__ = FIELDS
+
+class ProjectMaterial(Record):
+    FIELDS = ('id', 'project_id', 'material_id', 'quantity_used', 'name', 'brand', 'material_type')
+    __slots__ = FIELDS
@@ -1,6 +1,10 @@
 import os
 import sys
-from database import InventoryDatabase
+import sqlite3
+import threading
+import time
+from database import InventoryDatabase, SCHEMA_VERSION, CHANGE_LOG_LIMIT, MATERIAL_SORT_KEYS, material_sort_value
+from records import Material, Box
 
 def test_database():
     print("Testing Scrap Inventory Genie Database...")
@@ -104,9 +108,1335 @@ def test_database():
     print("All tests passed successfully!")
     print("=" * 50)
 
+def test_migrations():
+    print("Testing schema migrations...")
+    
+    test_db_path = "test_migrations.db"
+    if os.path.exists(test_db_path):
+        os.remove(test_db_path)
+    
+    conn = sqlite3.connect(test_db_path)
+    conn.execute("CREATE TABLE boxes (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, "
+                 "location TEXT, description TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)")
+    conn.execute("INSERT INTO boxes (name) VALUES ('Legacy Box')")
+    conn.execute("CREATE TABLE materials (id INTEGER PRIMARY KEY AUTOINCREMENT, box_id INTEGER, name TEXT NOT NULL, "
+                 "brand TEXT, material_type TEXT, width REAL, height REAL, depth REAL, unit TEXT DEFAULT 'cm', "
+                 "quantity INTEGER DEFAULT 1, color TEXT, tutorial_url TEXT, notes TEXT, is_used INTEGER DEFAULT 0, "
+                 "used_date TIMESTAMP, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)")
+    conn.execute("INSERT INTO materials (name, width, height, depth, unit) VALUES ('Legacy Plank', 2, 10, 0.5, 'in')")
+    conn.commit()
+    conn.close()
+    
+    db = InventoryDatabase(test_db_path)
+    assert db.get_schema_version() == SCHEMA_VERSION, "Schema should be upgraded in place"
+    assert db.get_boxes()[0]['name'] == "Legacy Box", "Existing rows should survive the upgrade"
+    
+    cursor = db.conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'idx_%'")
+    indexes = {row[0] for row in cursor.fetchall()}
+    print(f"   Indexes: {sorted(indexes)}")
+    assert "idx_materials_box_used_name" in indexes, "Box lookup index should exist"
+    assert "idx_project_materials_project" in indexes, "Project materials index should exist"
+    
+    plank = db.get_materials()[0]
+    assert plank['width_mm'] == 50.8, "Canonical dimensions should be backfilled"
+    assert len(db.search_materials(min_width=5, max_width=6, unit="cm")) == 1, "Backfilled rows should be searchable"
+    db.close()
+    
+    db = InventoryDatabase(test_db_path)
+    assert db.get_schema_version() == SCHEMA_VERSION, "Reopening should be a no-op"
+    db.close()
+    
+    os.remove(test_db_path)
+
+def test_query_plans():
+    print("Testing that every query uses an index...")
+    
+    test_db_path = "test_query_plans.db"
+    if os.path.exists(test_db_path):
+        os.remove(test_db_path)
+    
+    db = InventoryDatabase(test_db_path)
+    statements = []
+    db.conn.set_trace_callback(statements.append)
+    
+    box_id = db.add_box("Box", "Shelf", "")
+    db.get_boxes()
+    db.get_box_summaries()
+    db.get_box(box_id)
+    db.update_box(box_id, "Box 2")
+    material_id = db.add_material("Paper", box_id=box_id, width=10, height=20)
+    db.get_materials()
+    db.get_materials(include_used=False)
+    db.get_materials(box_id=box_id)
+    db.get_materials(box_id=box_id, include_used=False)
+    db.get_material(material_id)
+    db.update_material(material_id, quantity=3)
+    db.mark_material_used(material_id)
+    db.search_materials(name="Pap", min_width=5, max_width=15, include_used=False)
+    db.search_materials_fulltext("pap", brand="x", min_width=5, include_used=False)
+    db.get_materials_page({'include_used': False}, page_size=1, after=("A", 0))
+    db.get_materials_with_box({'box_id': box_id}, include_primary_image=True)
+    db.search_materials_fulltext("pap", include_primary_image=True)
+    db.search_materials_fulltext("pap", order_by='box_name', descending=True)
+    for order_by in MATERIAL_SORT_KEYS:
+        db.get_materials_page({'include_used': False}, order_by, page_size=1, after=("A", 0))
+    image_id = db.add_material_image(material_id, "a.png", is_primary=True)
+    db.get_material_images(material_id)
+    db.add_material_images(material_id, ["a.png", "c.png"], primary_index=1)
+    db.delete_material_image(image_id)
+    project_id = db.add_project("Project")
+    db.get_projects()
+    db.get_projects_page(page_size=1, after=("2000-01-01", 1))
+    db.get_project_summaries()
+    db.get_boxes_page(page_size=1, after=("A", 0))
+    db.get_project(project_id)
+    db.update_project(project_id, "Project 2")
+    db.complete_project(project_id)
+    project_image_id = db.add_project_image(project_id, "b.png")
+    db.get_project_images(project_id)
+    db.get_image_paths()
+    db.count_image_references("b.png")
+    db.add_project_images(project_id, ["b.png", "c.png"])
+    db.delete_project_image(project_image_id)
+    pm_id = db.add_project_material(project_id, material_id, 1)
+    db.get_project_materials(project_id)
+    db.set_project_materials(project_id, [(material_id, 2)])
+    db.remove_project_material(pm_id)
+    db.delete_project(project_id)
+    db.delete_material(material_id)
+    db.delete_box(box_id)
+    db.changes_since(0)
+    db.change_version()
+    db.get_material_page_anchors({'include_used': False}, page_size=2)
+    db.get_materials_page(db.fulltext_filters(name="pap"), 'quantity', page_size=1, after=(0, 0))
+    
+    db.conn.set_trace_callback(None)
+    
+    checked = 0
+    for statement in statements:
+        if not statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            continue
+        cursor = db.conn.execute("EXPLAIN QUERY PLAN " + statement)
+        details = [row[3] for row in cursor.fetchall()]
+        for detail in details:
+            assert not (detail.startswith("SCAN") and "USING" not in detail and "VIRTUAL TABLE" not in detail
+                        and "subquery" not in detail), \
+                f"Full table scan in: {statement.strip()} -> {detail}"
+        checked += 1
+    print(f"   Checked {checked} statements")
+    assert checked > 0, "Should have checked some statements"
+    
+    db.close()
+    os.remove(test_db_path)
+
+def test_bulk_insert():
+    print("Testing bulk insert...")
+    
+    test_db_path = "test_bulk_insert.db"
+    if os.path.exists(test_db_path):
+        os.remove(test_db_path)
+    
+    db = InventoryDatabase(test_db_path)
+    box_id = db.add_box("Bulk Box")
+    db.conn.execute("CREATE TEMP TRIGGER reject_bad BEFORE INSERT ON materials "
+                    "WHEN NEW.name = 'Bad' BEGIN SELECT RAISE(ABORT, 'rejected'); END")
+    
+    rows = [
+        {'name': "Felt", 'width': "10", 'height': "20", 'quantity': "3"},
+        {'name': ""},
+        {'name': "Cork", 'width': "abc"},
+        {'name': "Bad"},
+        {'name': "Wire", 'unit': "mm"},
+    ] + [{'name': f"Scrap {i}"} for i in range(7)]
+    
+    results = db.add_materials_bulk(rows, box_id=box_id, chunk_size=3)
+    errors = [index for index, result in enumerate(results) if result['error']]
+    print(f"   Rows with errors: {errors}")
+    assert errors == [1, 2, 3], "Only invalid or rejected rows should fail"
+    
+    inserted = [result['id'] for result in results if result['id']]
+    assert len(inserted) == 9, "Every other row should be inserted"
+    assert db.get_material(results[0]['id'])['quantity'] == 3, "Values should be converted"
+    assert db.get_material(results[4]['id'])['name'] == "Wire", "Ids should map back to their rows"
+    assert len(db.get_materials(box_id=box_id)) == 9, "All rows should land in the default box"
+    
+    db.close()
+    os.remove(test_db_path)
+
+def test_transactions():
+    print("Testing transactions...")
+    
+    test_db_path = "test_transactions.db"
+    if os.path.exists(test_db_path):
+        os.remove(test_db_path)
+    
+    db = InventoryDatabase(test_db_path)
+    statements = []
+    db.conn.set_trace_callback(statements.append)
+    
+    with db.transaction():
+        box_id = db.add_box("Kept Box")
+        material_id = db.add_material("Kept", box_id=box_id)
+        try:
+            with db.transaction():
+                db.add_material("Discarded", box_id=box_id)
+                raise RuntimeError("abort inner block")
+        except RuntimeError:
+            pass
+        db.update_material(material_id, quantity=4)
+    
+    db.conn.set_trace_callback(None)
+    commits = [statement for statement in statements if statement.strip().upper() == "COMMIT"]
+    print(f"   Commits issued: {len(commits)}")
+    assert len(commits) == 1, "Nested work should commit once"
+    
+    other = sqlite3.connect(test_db_path)
+    names = [row[0] for row in other.execute("SELECT name FROM materials")]
+    other.close()
+    assert names == ["Kept"], "Inner savepoint should be rolled back and outer work committed"
+    
+    try:
+        with db.transaction():
+            db.delete_material(material_id)
+            raise RuntimeError("abort outer block")
+    except RuntimeError:
+        pass
+    assert db.get_material(material_id)['quantity'] == 4, "Outer failure should roll back everything"
+    
+    db.close()
+    os.remove(test_db_path)
+
+def test_fulltext_search():
+    print("Testing full-text search...")
+    
+    test_db_path = "test_fulltext.db"
+    if os.path.exists(test_db_path):
+        os.remove(test_db_path)
+    
+    db = InventoryDatabase(test_db_path)
+    print(f"   FTS5 available: {db.fts_enabled}")
+    
+    felt_id = db.add_material("Red Felt", brand="Crafty", material_type="Fabric", color="Red", width=10)
+    paper_id = db.add_material("Paper Sheet", brand="Redwood", material_type="Paper", color="White", width=30)
+    db.add_material("Blue Foam", brand="Crafty", material_type="Foam", notes="red stains", width=20)
+    
+    results = db.search_materials_fulltext("red")
+    names = [material['name'] for material in results]
+    print(f"   'red' matches: {names}")
+    assert set(names) == {"Red Felt", "Paper Sheet", "Blue Foam"}, "Prefix match should cover every column"
+    assert names[0] == "Red Felt", "Name matches should rank first"
+    
+    results = db.search_materials_fulltext(brand="craf", material_type="fab")
+    assert [material['id'] for material in results] == [felt_id], "Column filters should be combined"
+    
+    results = db.search_materials_fulltext("red", min_width=25)
+    assert [material['id'] for material in results] == [paper_id], "Other filters should still apply"
+    
+    db.update_material(paper_id, brand="Oakwood")
+    db.delete_material(felt_id)
+    names = [material['name'] for material in db.search_materials_fulltext("red")]
+    assert names == ["Blue Foam"], "Index should follow updates and deletes"
+    
+    db.add_materials_bulk([{'name': f"Offcut {i}"} for i in range(30)])
+    statements = []
+    db.conn.set_trace_callback(statements.append)
+    results = db.search_materials_fulltext("", limit=3)
+    db.conn.set_trace_callback(None)
+    assert [m['name'] for m in results] == ["Blue Foam", "Offcut 0", "Offcut 1"], "Empty searches should list by name"
+    assert len(statements) == 1 and statements[0].rstrip().endswith("LIMIT 3"), "Limits should be pushed into the query"
+    
+    db.fts_enabled = False
+    names = [material['name'] for material in db.search_materials_fulltext("red")]
+    assert names == ["Blue Foam"], "LIKE fallback should give the same matches"
+    
+    db.close()
+    os.remove(test_db_path)
+
+def test_dimension_index():
+    print("Testing dimension index...")
+    
+    test_db_path = "test_dimension_index.db"
+    if os.path.exists(test_db_path):
+        os.remove(test_db_path)
+    
+    db = InventoryDatabase(test_db_path)
+    print(f"   R*Tree available: {db.rtree_enabled}")
+    
+    ids = [db.add_material(f"Piece {w}x{h}", width=w, height=h, depth=1) for w in range(10, 60, 5) for h in range(10, 80, 10)]
+    db.update_material(ids[0], width=30, height=45)
+    db.delete_material(ids[1])
+    db.mark_material_used(ids[2])
+    
+    query = dict(min_width=20, max_width=40, min_height=30, max_height=60, include_used=False)
+    indexed = [material['id'] for material in db.search_materials(**query)]
+    db.rtree_enabled = False
+    scanned = [material['id'] for material in db.search_materials(**query)]
+    print(f"   Matches: {len(indexed)}")
+    assert indexed == scanned, "Index should return exactly the row-by-row matches"
+    assert ids[0] in indexed, "Updated dimensions should be indexed"
+    
+    db.close()
+    os.remove(test_db_path)
+
+def test_unit_normalization():
+    print("Testing unit-normalized dimensions...")
+    
+    test_db_path = "test_units.db"
+    if os.path.exists(test_db_path):
+        os.remove(test_db_path)
+    
+    db = InventoryDatabase(test_db_path)
+    mm_id = db.add_material("Dowel", width=250, height=10, unit="mm")
+    inch_id = db.add_material("Board", width=10, height=4, unit="in")
+    cm_id = db.add_material("Card", width=30, height=20, unit="cm")
+    db.add_materials_bulk([{'name': "Sheet", 'width': "0.26", 'height': "0.1", 'unit': "m"}])
+    
+    results = db.search_materials(min_width=24, max_width=27, unit="cm")
+    names = sorted(material['name'] for material in results)
+    print(f"   24-27 cm wide: {names}")
+    assert names == ["Board", "Dowel", "Sheet"], "Ranges should compare across units"
+    
+    results = db.search_materials(min_width=11, unit="in")
+    assert [material['id'] for material in results] == [cm_id], "Bounds should be converted from the search unit"
+    
+    db.update_material(mm_id, unit="cm")
+    material = db.get_material(mm_id)
+    assert material['width'] == 250 and material['width_mm'] == 2500, "Canonical values should follow unit changes"
+    assert material['unit'] == "cm", "Original unit should be kept for display"
+    
+    db.update_material(inch_id, width=20)
+    assert db.get_material(inch_id)['width_mm'] == 508, "Canonical values should follow dimension changes"
+    
+    db.close()
+    os.remove(test_db_path)
+
+def test_keyset_pagination():
+    print("Testing keyset pagination...")
+    
+    test_db_path = "test_pagination.db"
+    if os.path.exists(test_db_path):
+        os.remove(test_db_path)
+    
+    db = InventoryDatabase(test_db_path)
+    db.add_materials_bulk([{'name': f"Item {i % 9}", 'width': i} for i in range(50)])
+    
+    expected = sorted(db.get_materials(), key=lambda material: (material['name'], material['id']))
+    
+    rows, cursor = db.get_materials_page(page_size=7)
+    assert len(rows) == 7 and cursor == (rows[-1]['name'], rows[-1]['id']), "Page should end with a cursor"
+    
+    streamed = rows
+    while cursor is not None:
+        rows, cursor = db.get_materials_page(page_size=7, after=cursor)
+        assert len(rows) <= 7, "Pages should be bounded"
+        streamed += rows
+    print(f"   Streamed {len(streamed)} materials")
+    assert [m['id'] for m in streamed] == [m['id'] for m in expected], "Pages should cover every row once, in order"
+    assert 'sort_key' not in streamed[0], "Cursor column should not leak into rows"
+    
+    resumed = list(db.iter_materials(page_size=7, after=(expected[19]['name'], expected[19]['id'])))
+    assert [m['id'] for m in resumed] == [m['id'] for m in expected[20:]], "Iteration should resume after a cursor"
+    
+    descending = list(db.iter_materials({'min_width': 10, 'unit': "mm"}, order_by="id", descending=True, page_size=4))
+    assert [m['width'] for m in descending] == list(range(49, 0, -1)), "Filters and descending order should apply"
+    
+    for i in range(5):
+        db.add_project(f"Project {i}")
+    assert len(list(db.iter_projects(page_size=2))) == 5, "Projects should stream across pages"
+    
+    db.close()
+    os.remove(test_db_path)
+
+def test_materials_with_box():
+    print("Testing material listing with box names...")
+    
+    test_db_path = "test_materials_with_box.db"
+    if os.path.exists(test_db_path):
+        os.remove(test_db_path)
+    
+    db = InventoryDatabase(test_db_path)
+    box_ids = [db.add_box(f"Box {i}") for i in range(5)]
+    
+    def count_listing_queries(page_size):
+        statements = []
+        db.conn.set_trace_callback(statements.append)
+        materials = list(db.iter_materials(page_size=page_size, include_primary_image=True))
+        db.conn.set_trace_callback(None)
+        return materials, len([statement for statement in statements if statement.lstrip().upper().startswith("SELECT")])
+    
+    db.add_materials_bulk([{'name': f"Small {i}", 'box_id': box_ids[i % 5]} for i in range(10)])
+    materials, small_queries = count_listing_queries(page_size=4)
+    
+    db.add_materials_bulk([{'name': f"Large {i}", 'box_id': box_ids[i % 5]} for i in range(390)] + [{'name': "Loose"}])
+    first_id = materials[0]['id']
+    db.add_material_image(first_id, "first.png")
+    db.add_material_image(first_id, "cover.png", is_primary=True)
+    materials, large_queries = count_listing_queries(page_size=100)
+    
+    print(f"   Queries for 10 rows in pages of 4: {small_queries}, for {len(materials)} rows in pages of 100: {large_queries}")
+    assert small_queries == 3 and large_queries == 5, "Listing should cost one query per page regardless of row count"
+    assert db.get_materials_with_box(include_primary_image=True) == materials, "Default paging should list the same rows"
+    
+    by_name = {material['name']: material for material in materials}
+    assert by_name["Small 3"]['box_name'] == "Box 3", "Box name should be listed with the material"
+    assert by_name["Loose"]['box_name'] is None, "Unboxed materials should still be listed"
+    assert by_name["Loose"]['primary_image'] is None, "Materials without images have no primary image"
+    assert [m['primary_image'] for m in materials if m['id'] == first_id] == ["cover.png"], "Primary image should win"
+    
+    results = db.search_materials_fulltext(name="small")
+    assert len(results) == 10 and all(material['box_name'] for material in results), "Search should return box names"
+    
+    db.close()
+    os.remove(test_db_path)
+
+def test_summaries():
+    print("Testing box and project summaries...")
+    
+    test_db_path = "test_summaries.db"
+    if os.path.exists(test_db_path):
+        os.remove(test_db_path)
+    
+    db = InventoryDatabase(test_db_path)
+    full_box = db.add_box("A Box")
+    empty_box = db.add_box("B Box")
+    ids = [db.add_material(f"Piece {i}", box_id=full_box, quantity=i + 1) for i in range(4)]
+    db.add_material("Loose")
+    db.mark_material_used(ids[0])
+    
+    summaries = db.get_box_summaries()
+    print(f"   Box summaries: {[(box['name'], box['material_count']) for box in summaries]}")
+    assert [box['id'] for box in summaries] == [full_box, empty_box], "Boxes should be ordered by name"
+    full, empty = summaries
+    assert (full['material_count'], full['available_count'], full['used_count'], full['total_quantity']) == (4, 3, 1, 10)
+    assert (empty['material_count'], empty['available_count'], empty['used_count'], empty['total_quantity']) == (0, 0, 0, 0)
+    
+    busy_project = db.add_project("Busy")
+    idle_project = db.add_project("Idle")
+    db.add_project_material(busy_project, ids[0], 2)
+    db.add_project_material(busy_project, ids[1], 3)
+    
+    summaries = {project['id']: project for project in db.get_project_summaries()}
+    assert (summaries[busy_project]['material_count'], summaries[busy_project]['total_quantity']) == (2, 5)
+    assert (summaries[idle_project]['material_count'], summaries[idle_project]['total_quantity']) == (0, 0)
+    
+    db.delete_material(ids[1])
+    summaries = {project['id']: project for project in db.get_project_summaries()}
+    assert (summaries[busy_project]['material_count'], summaries[busy_project]['total_quantity']) == (1, 2), \
+        "Deleted materials should not be counted"
+    assert len(db.get_project_materials(busy_project)) == summaries[busy_project]['material_count']
+    
+    db.close()
+    os.remove(test_db_path)
+
+def test_record_rows():
+    print("Testing slotted record rows...")
+    
+    test_db_path = "test_records.db"
+    if os.path.exists(test_db_path):
+        os.remove(test_db_path)
+    
+    db = InventoryDatabase(test_db_path, row_factory="record")
+    box_id = db.add_box("Bin", "Garage")
+    material_id = db.add_material("Cork", box_id=box_id, brand="Acme", width=5, height=6)
+    
+    material = db.get_material(material_id)
+    assert isinstance(material, Material), "Rows should be Material records"
+    assert not hasattr(material, "__dict__"), "Records should not carry a per-instance dict"
+    assert material['name'] == material.name == "Cork", "Dict-style and attribute access should agree"
+    assert material.get('missing', "default") == "default", "get() should fall back like a dict"
+    assert dict(material)['brand'] == "Acme", "Records should convert to dicts"
+    
+    listed = db.get_materials_with_box()[0]
+    assert isinstance(listed, Material) and listed['box_name'] == "Bin", "Box names should be available"
+    assert 'sort_key' not in listed, "Cursor column should not leak into records"
+    
+    summary = db.get_box_summaries()[0]
+    assert isinstance(summary, Box) and summary['material_count'] == 1, "Summaries should be Box records"
+    
+    db.close()
+    
+    db = InventoryDatabase(test_db_path)
+    assert type(db.get_material(material_id)) is dict, "Dicts should remain the default"
+    db.close()
+    os.remove(test_db_path)
+
+def test_connection_pool():
+    print("Testing WAL mode and per-thread connections...")
+    
+    test_db_path = "test_pool.db"
+    if os.path.exists(test_db_path):
+        os.remove(test_db_path)
+    
+    db = InventoryDatabase(test_db_path)
+    assert db.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal", "WAL should be the default journal"
+    assert db.conn.execute("PRAGMA synchronous").fetchone()[0] == 1, "Synchronous should default to NORMAL"
+    db.add_box("Shelf")
+    
+    results = {}
+    def read_boxes():
+        results['conn'] = db.conn
+        results['boxes'] = sorted(box['name'] for box in db.get_boxes())
+    
+    def run(target):
+        worker = threading.Thread(target=target)
+        worker.start()
+        worker.join(5)
+    
+    with db.transaction():
+        db.add_box("Pending")
+        run(read_boxes)
+        assert results['conn'] is not db.conn, "Each thread should get its own connection"
+        assert results['boxes'] == ["Shelf"], "Readers should not block on or see an open write"
+    run(read_boxes)
+    assert results['boxes'] == ["Pending", "Shelf"], "Readers should see committed writes"
+    
+    for i in range(50):
+        db.add_material(f"Scrap {i}", width=i)
+    expected = [m['id'] for m in db.get_materials()]
+    listings = []
+    workers = [threading.Thread(target=lambda: listings.append([m['id'] for m in db.get_materials()]))
+               for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(5)
+    assert listings == [expected] * 4, "Concurrent readers should not clobber each other's results"
+    db.close()
+    
+    db = InventoryDatabase(test_db_path, pragmas={'synchronous': "FULL", 'cache_size': -2000})
+    assert db.conn.execute("PRAGMA synchronous").fetchone()[0] == 2, "Pragmas should be configurable"
+    assert db.conn.execute("PRAGMA cache_size").fetchone()[0] == -2000, "Pragmas should be configurable"
+    db.close()
+    os.remove(test_db_path)
+    
+    db = InventoryDatabase(":memory:")
+    db.add_box("Scratch")
+    run(read_boxes)
+    assert results['conn'] is db.conn, "In-memory databases should share one connection"
+    assert results['boxes'] == ["Scratch"], "In-memory data should be visible across threads"
+    db.close()
+
+def test_entity_cache():
+    print("Testing entity cache...")
+    
+    test_db_path = "test_cache.db"
+    if os.path.exists(test_db_path):
+        os.remove(test_db_path)
+    
+    db = InventoryDatabase(test_db_path)
+    box_id = db.add_box("Drawer", "Desk")
+    material_id = db.add_material("Ribbon", box_id=box_id)
+    project_id = db.add_project("Card")
+    
+    for _ in range(3):
+        db.get_box(box_id)
+        db.get_boxes()
+        db.get_material(material_id)
+        db.get_project(project_id)
+    stats = db.cache_stats()
+    print(f"   Stats: {stats}")
+    assert stats['misses'] == 4 and stats['hits'] == 8, "Repeated lookups should be served from the cache"
+    
+    db.get_box(box_id)['name'] = "Mutated"
+    db.get_boxes()[0]['name'] = "Mutated"
+    assert db.get_box(box_id)['name'] == "Drawer", "Callers should get copies of cached rows"
+    assert db.get_boxes()[0]['name'] == "Drawer", "Callers should get copies of cached lists"
+    
+    db.update_box(box_id, "Top Drawer", "Desk")
+    db.add_box("Another")
+    assert db.get_box(box_id)['name'] == "Top Drawer", "Updates should invalidate the box"
+    assert [box['name'] for box in db.get_boxes()] == ["Another", "Top Drawer"], "Box list should be invalidated"
+    
+    db.update_material(material_id, quantity=5)
+    assert db.get_material(material_id)['quantity'] == 5, "Material updates should invalidate"
+    db.mark_material_used(material_id)
+    assert db.get_material(material_id)['is_used'] == 1, "Marking used should invalidate"
+    db.complete_project(project_id)
+    assert db.get_project(project_id)['completed_at'], "Completing a project should invalidate"
+    
+    try:
+        with db.transaction():
+            db.update_box(box_id, "Uncommitted", "Desk")
+            assert db.get_box(box_id)['name'] == "Uncommitted", "Reads inside a transaction see its writes"
+            raise RuntimeError("abort")
+    except RuntimeError:
+        pass
+    assert db.get_box(box_id)['name'] == "Top Drawer", "Rolled back writes should not stay cached"
+    
+    db.delete_material(material_id)
+    db.delete_project(project_id)
+    db.delete_box(box_id)
+    assert db.get_material(material_id) is None, "Deleted materials should not be served from the cache"
+    assert db.get_project(project_id) is None, "Deleted projects should not be served from the cache"
+    assert db.get_box(box_id) is None, "Deleted boxes should not be served from the cache"
+    db.close()
+    
+    db = InventoryDatabase(test_db_path, cache_size=0)
+    db.get_boxes()
+    db.get_boxes()
+    assert db.cache_stats()['hits'] == 0, "A zero-sized cache should be disabled"
+    db.close()
+    os.remove(test_db_path)
+
+def test_change_tracking():
+    print("Testing change tracking...")
+    
+    test_db_path = "test_changes.db"
+    if os.path.exists(test_db_path):
+        os.remove(test_db_path)
+    
+    db = InventoryDatabase(test_db_path)
+    version = db.change_version()
+    token = db.data_version()
+    assert db.data_version() == token, "Data version should be stable while nothing changes"
+    assert db.changes_since(version) == [], "No changes should be reported yet"
+    
+    box_id = db.add_box("Crate")
+    material_id = db.add_material("Twine", box_id=box_id)
+    project_id = db.add_project("Wreath")
+    db.add_project_material(project_id, material_id)
+    db.update_material(material_id, quantity=2)
+    db.mark_material_used(material_id)
+    assert db.data_version() != token, "Local writes should change the data version"
+    
+    changes = db.changes_since(version)
+    print(f"   Changes: {[(c['table_name'], c['row_id'], c['op']) for c in changes]}")
+    assert [(c['table_name'], c['op']) for c in changes] == [
+        ('boxes', 'insert'), ('projects', 'insert'), ('project_materials', 'insert'), ('materials', 'update')
+    ], "Changes should be collapsed to the latest operation per row"
+    assert [c['version'] for c in changes] == sorted(c['version'] for c in changes), "Changes should be ordered"
+    
+    version = db.change_version()
+    db.delete_material(material_id)
+    assert [(c['table_name'], c['row_id'], c['op']) for c in db.changes_since(version)] == [
+        ('materials', material_id, 'delete')
+    ], "Deletes should be logged"
+    
+    db.get_box(box_id)
+    version = db.change_version()
+    token = db.data_version()
+    other = sqlite3.connect(test_db_path)
+    other.execute("UPDATE boxes SET name = 'Renamed' WHERE id = ?", (box_id,))
+    other.commit()
+    other.close()
+    assert db.data_version() != token, "Commits from other connections should change the data version"
+    assert [(c['table_name'], c['op']) for c in db.changes_since(version)] == [('boxes', 'update')], \
+        "Changes from other processes should be logged"
+    assert db.get_box(box_id)['name'] == "Renamed", "External changes should evict cached rows"
+    
+    for i in range(5):
+        db.add_box(f"Box {i}")
+    db.prune_change_log(keep=2)
+    assert db.changes_since(version) is None, "Pruned history should ask for a full reload"
+    assert len(db.changes_since(db.change_version() - 2)) == 2, "Recent history should survive pruning"
+    
+    version = db.change_version()
+    db.add_materials_bulk([{'name': f"Scrap {i}"} for i in range(CHANGE_LOG_LIMIT + 500)])
+    logged = db.conn.execute("SELECT COUNT(*) FROM change_log").fetchone()[0]
+    print(f"   {logged} change log rows kept after a {CHANGE_LOG_LIMIT + 500} row import")
+    assert logged <= CHANGE_LOG_LIMIT, "Bulk imports should prune the change log"
+    assert db.changes_since(version) is None, "An import larger than the log should ask for a full reload"
+    
+    from gui.change_monitor import ChangeMonitor
+    monitor = ChangeMonitor(FakeWidget(), db, None)
+    for i in range(5):
+        db.add_box(f"Crate {i}")
+    changes, monitor.version = monitor.read_changes(db.change_version() - 5)
+    assert len(changes) == 5, "The monitor should read recent changes"
+    assert db.prune_change_log() == 0, "Reading changes should prune old history"
+    
+    db.close()
+    os.remove(test_db_path)
+
+class FakeWidget:
+    def __init__(self):
+        self.callbacks = []
+        self.reported = []
+    
+    def _root(self):
+        return self
+    
+    def report_callback_exception(self, exc, val, tb):
+        self.reported.append(val)
+    
+    def after(self, delay, callback):
+        self.callbacks.append(callback)
+        return len(self.callbacks)
+    
+    def after_cancel(self, after_id):
+        pass
+    
+    def pump(self, adb, timeout=5):
+        deadline = time.time() + timeout
+        while adb.pending and time.time() < deadline:
+            callbacks, self.callbacks = self.callbacks, []
+            for callback in callbacks:
+                callback()
+            time.sleep(0.01)
+
+def test_async_database():
+    print("Testing asynchronous database facade...")
+    from gui.async_database import AsyncInventoryDatabase
+    
+    test_db_path = "test_async.db"
+    if os.path.exists(test_db_path):
+        os.remove(test_db_path)
+    
+    db = InventoryDatabase(test_db_path)
+    db.add_materials_bulk([{'name': f"Scrap {i}", 'width': i % 50} for i in range(500)])
+    widget = FakeWidget()
+    adb = AsyncInventoryDatabase(widget, db)
+    
+    delivered = []
+    blocker = threading.Event()
+    adb.submit(blocker.wait, 5)
+    adb.submit('get_materials_with_box', callback=lambda rows: delivered.append("stale"), key='materials')
+    adb.submit('get_materials_with_box', {'min_width': 40},
+               callback=lambda rows: delivered.append((len(rows), threading.current_thread().name)),
+               key='materials')
+    blocker.set()
+    widget.pump(adb)
+    print(f"   Delivered: {delivered}")
+    assert delivered == [(100, threading.main_thread().name)], \
+        "Only the newest request should be delivered, on the Tk thread"
+    
+    errors = []
+    adb.submit('search_materials', unit="parsec", min_width=1, error_callback=errors.append)
+    widget.pump(adb)
+    assert len(errors) == 1 and isinstance(errors[0], ValueError), "Errors should reach the error callback"
+    
+    def broken_callback(boxes):
+        raise RuntimeError("callback failed")
+    
+    adb.submit(lambda: [], callback=broken_callback)
+    adb.submit(lambda: [], callback=lambda boxes: delivered.append("after failure"))
+    widget.pump(adb)
+    assert [str(e) for e in widget.reported] == ["callback failed"], "Callback errors should be reported"
+    assert delivered[-1] == "after failure" and adb.pending == 0, "A failing callback should not stop delivery"
+    
+    slow_query = ("WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 1000000000) "
+                  "SELECT COUNT(*) FROM c")
+    start = time.time()
+    adb.submit(lambda: db.conn.execute(slow_query).fetchone(), callback=delivered.append, key='search')
+    while adb.running is None:
+        time.sleep(0.01)
+    adb.submit('get_boxes', callback=lambda boxes: delivered.append("boxes"), key='search')
+    widget.pump(adb)
+    assert delivered[-1] == "boxes" and time.time() - start < 5, "Superseded queries should be interrupted"
+    
+    adb.close()
+    db.close()
+    os.remove(test_db_path)
+
+def test_page_anchors():
+    print("Testing page anchors for random access...")
+    
+    db = InventoryDatabase(":memory:")
+    db.add_materials_bulk([{'name': f"Sheet {i % 13}", 'width': i % 7} for i in range(250)])
+    
+    for filters, descending in (({}, False), ({'min_width': 3}, True)):
+        expected = [m['id'] for m in db.iter_materials(filters, descending=descending)]
+        total, anchors = db.get_material_page_anchors(filters, descending=descending, page_size=20)
+        print(f"   {total} rows, {len(anchors)} anchors")
+        assert total == len(expected), "Total should count every matching row"
+        assert len(anchors) == total // 20, "There should be one anchor per full page"
+        
+        for page in range(len(anchors) + 1):
+            rows, _ = db.get_materials_page(filters, descending=descending, page_size=20,
+                                            after=anchors[page - 1] if page else None)
+            assert [m['id'] for m in rows] == expected[page * 20:(page + 1) * 20], "Anchors should start each page"
+    
+    db.close()
+
+def test_column_sorting():
+    print("Testing server-side column sorting...")
+    
+    db = InventoryDatabase(":memory:")
+    box_ids = [db.add_box(name) for name in ("Crate", "Attic", "Bin")]
+    db.add_materials_bulk([
+        {
+            'name': f"Scrap {i % 17}",
+            'box_id': box_ids[i % 4] if i % 4 < 3 else None,
+            'brand': ["Acme", "", None, "Oakline"][i % 4],
+            'material_type': ["Paper", None, "Foam"][i % 3],
+            'width': i % 9, 'height': i % 5, 'unit': ["cm", "mm", "in"][i % 3],
+            'quantity': i % 6, 'color': [None, "Red", "Blue"][i % 3],
+        }
+        for i in range(120)
+    ])
+    for material_id in range(1, 121, 7):
+        db.mark_material_used(material_id)
+    
+    for order_by in MATERIAL_SORT_KEYS:
+        for descending in (False, True):
+            filters = {'include_used': order_by != 'is_used'}
+            materials = db.get_materials_with_box(filters)
+            expected = sorted(((material_sort_value(m, order_by), m['id']) for m in materials), reverse=descending)
+            
+            total, anchors = db.get_material_page_anchors(filters, order_by, descending, page_size=25)
+            listed = []
+            for page in range(len(anchors) + 1):
+                rows, _ = db.get_materials_page(filters, order_by, descending, page_size=25,
+                                                after=anchors[page - 1] if page else None)
+                listed.extend(m['id'] for m in rows)
+            assert total == len(expected), "Sorting should not change the row count"
+            assert listed == [row_id for _, row_id in expected], f"Pages should be sorted by {order_by}"
+            
+            results = db.search_materials_fulltext(name="scrap", order_by=order_by, descending=descending, **filters)
+            assert [m['id'] for m in results] == [row_id for _, row_id in expected], "Search should honour the sort"
+    
+    for order_by in ('brand', 'area', 'box_name'):
+        plan = db.conn.execute(f"EXPLAIN QUERY PLAN SELECT id FROM materials m ORDER BY {MATERIAL_SORT_KEYS[order_by]}, m.id")
+        details = " ".join(row[3] for row in plan.fetchall())
+        print(f"   {order_by}: {details}")
+        assert "idx_materials_sort_" in details and "TEMP B-TREE" not in details, "Sorting should walk an index"
+    
+    statements = []
+    db.conn.set_trace_callback(statements.append)
+    db.get_materials_page({}, 'box_name')
+    db.conn.set_trace_callback(None)
+    assert not any("boxes" in statement for statement in statements), "Listings should not join boxes any more"
+    
+    material_id = db.get_materials_with_box({'box_id': box_ids[0]})[0]['id']
+    assert db.get_material(material_id)['box_name'] == "Crate", "Box names should be stored on insert"
+    db.update_box(box_ids[0], "Zinc")
+    assert db.get_material(material_id)['box_name'] == "Zinc", "Renaming a box should update its materials"
+    db.update_material(material_id, box_id=box_ids[1])
+    assert db.get_material(material_id)['box_name'] == "Attic", "Moving a material should update its box name"
+    db.delete_box(box_ids[1])
+    assert db.get_material(material_id)['box_name'] is None, "Deleting a box should clear its name"
+    
+    try:
+        db.search_materials_fulltext("scrap", order_by="notes")
+        assert False, "Unknown sort keys should be rejected"
+    except ValueError:
+        pass
+    
+    db.close()
+
+def test_search_cache():
+    print("Testing search result cache...")
+    from gui.search_cache import SearchCache
+    
+    db = InventoryDatabase(":memory:")
+    db.add_materials_bulk([
+        {'name': name, 'brand': brand, 'color': color, 'width': width, 'height': 10, 'unit': unit}
+        for name, brand, color, width, unit in (
+            ("Red Felt", "Acme", "Red", 12, "cm"), ("Felt Roll", "Felton", "Green", 300, "mm"),
+            ("Café Paper", "Acme", "White", 5, "in"), ("Cafe Foam", None, "Red", 8, "cm"),
+            ("Fabric 100%", "Oakline", None, 20, "cm"), ("Felted Wool", "Acme", "Red", 40, "cm"),
+        )
+    ])
+    db.mark_material_used(1)
+    
+    queries = [
+        ({'name': "f"}, {}), ({'name': "fe"}, {}), ({'name': "felt"}, {'min_width': 10}),
+        ({'name': "felt r"}, {'min_width': 10, 'max_width': 35}), ({'name': "felt"}, {'min_width': 100, 'unit': "mm"}),
+        ({'name': "ca"}, {}), ({'name': "caf", 'color': "r"}, {}), ({'name': "café"}, {'include_used': False}),
+        ({'name': "f", 'brand': "ac"}, {'include_used': False}), ({'name': "fe"}, {}),
+    ]
+    for fulltext in (True, False):
+        db.fts_enabled = fulltext
+        for order in ((None, False), ('name', True)):
+            cache = SearchCache(fulltext)
+            statements = []
+            misses = 0
+            db.conn.set_trace_callback(statements.append)
+            for text, filters in queries:
+                expected = [m['id'] for m in db.search_materials_fulltext(**text, **filters, order_by=order[0],
+                                                                          descending=order[1])]
+                rows = cache.get(text, filters, order)
+                if rows is None:
+                    misses += 1
+                    rows = db.search_materials_fulltext(**text, **filters, order_by=order[0], descending=order[1])
+                    cache.put(text, filters, order, rows)
+                assert [m['id'] for m in rows] == expected, f"Cached results should match SQL for {text}"
+            db.conn.set_trace_callback(None)
+            print(f"   FTS {fulltext}, order {order}: {cache.refined} of {len(queries)} searches refined in memory")
+            relevance_ranked = fulltext and order[0] is None
+            assert cache.refined == (1 if relevance_ranked else 7), "Narrowing searches should be refined from cached results"
+            statements = [statement for statement in statements if not statement.startswith("--")]
+            assert len(statements) == len(queries) + misses, "Cached and refined searches should not query SQLite"
+            assert set(cache.rows) == {row_id for _, entry in cache.entries.items() for row_id in entry[3]}, \
+                "Rows should be stored once per material"
+        
+        cache = SearchCache(fulltext, maxsize=1)
+        cache.put({'name': "f"}, {}, ('name', False), db.search_materials_fulltext(name="f"))
+        cache.put({'name': "ca"}, {}, ('name', False), db.search_materials_fulltext(name="ca"))
+        assert set(cache.rows) == {m['id'] for m in db.search_materials_fulltext(name="ca")}, "Evicted rows should be dropped"
+        
+        assert cache.get({'name': "fel"}, {}, ('name', False)) is None, "Sort order should be part of the key"
+        assert cache.get({'name': "x"}, {}, (None, False)) is None, "Unrelated searches should miss"
+        cache.clear()
+        assert cache.get({'name': "felt"}, {}, (None, False)) is None, "Clearing should drop every entry"
+    
+    db.fts_enabled = True
+    db.add_materials_bulk([{'name': "Felt"}, {'name': "Foam Fleece Fabric Felt Offcut Roll"}, {'name': "Fringe Felt"}])
+    cache = SearchCache(True)
+    broad = db.search_materials_fulltext(name="f")
+    cache.put({'name': "f"}, {}, (None, False), broad)
+    ranked = [m['id'] for m in db.search_materials_fulltext(name="felt")]
+    assert [m['id'] for m in broad if m['id'] in ranked] != ranked, "Relevance should change as the text narrows"
+    assert cache.get({'name': "felt"}, {}, (None, False)) is None, "Relevance-ranked results should not be refined"
+    
+    db.close()
+
+def test_thumbnail_cache():
+    print("Testing thumbnail disk cache...")
+    import shutil
+    import tempfile
+    from PIL import Image
+    from thumbnails import ThumbnailCache, THUMBNAIL_SIZES
+    
+    directory = tempfile.mkdtemp()
+    photo_path = os.path.join(directory, "photo.jpg")
+    logo_path = os.path.join(directory, "logo.png")
+    Image.new("RGB", (4000, 3000), (200, 80, 40)).save(photo_path, quality=95)
+    Image.new("RGBA", (600, 600), (0, 0, 0, 0)).save(logo_path)
+    
+    cache = ThumbnailCache(os.path.join(directory, ".thumbs"))
+    size = THUMBNAIL_SIZES['material']
+    
+    start = time.perf_counter()
+    thumbnail = cache.get(photo_path, size)
+    generated = time.perf_counter() - start
+    start = time.perf_counter()
+    cached = cache.get(photo_path, size)
+    loaded = time.perf_counter() - start
+    print(f"   Generated in {generated * 1000:.1f} ms, loaded from disk in {loaded * 1000:.1f} ms")
+    
+    assert thumbnail.size == cached.size == (533, 400), "Thumbnails should fit the requested size"
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1, "The second lookup should hit the disk cache"
+    assert cache.get(logo_path, size).mode == "RGBA", "Transparent images should keep their alpha channel"
+    
+    os.utime(photo_path, ns=(0, 0))
+    cache.get(photo_path, size)
+    assert cache.stats()['misses'] == 3, "Changing the original should invalidate its thumbnail"
+    
+    assert cache.warm(photo_path, THUMBNAIL_SIZES.values()), "Warming should generate every size"
+    assert not cache.warm(os.path.join(directory, "missing.jpg")), "Warming should ignore unreadable files"
+    
+    cache.max_bytes = sum(size for _, size, _ in cache.scan()) - 1
+    cache.evict()
+    assert 0 < len(cache.scan()) < 5 and cache.stats()['bytes'] <= cache.max_bytes, "Eviction should respect the budget"
+    
+    cache.clear()
+    assert not cache.scan(), "Clearing should remove every thumbnail"
+    shutil.rmtree(directory)
+
+def test_image_prefetcher():
+    print("Testing background image prefetch...")
+    import shutil
+    import tempfile
+    from PIL import Image
+    from thumbnails import ThumbnailCache
+    from gui.image_prefetcher import ImagePrefetcher
+    
+    directory = tempfile.mkdtemp()
+    paths = []
+    for i in range(8):
+        paths.append(os.path.join(directory, f"photo{i}.jpg"))
+        Image.new("RGB", (1200, 900), (i * 30, 80, 40)).save(paths[-1])
+    paths.append(os.path.join(directory, "broken.jpg"))
+    with open(paths[-1], "w") as broken:
+        broken.write("not an image")
+    
+    widget = FakeWidget()
+    thumbnails = ThumbnailCache(os.path.join(directory, ".thumbs"))
+    prefetcher = ImagePrefetcher(widget, thumbnails, (300, 200), radius=2)
+    shown = []
+    
+    prefetcher.load(paths[3], lambda image, error: shown.append((3, image.size, threading.current_thread().name)))
+    prefetcher.prefetch(paths, 3)
+    widget.pump(prefetcher)
+    assert shown == [(3, (267, 200), "MainThread")], "The current image should be delivered on the Tk thread"
+    assert sorted(prefetcher.images) == paths[1:6], "Neighbouring images should be decoded ahead of time"
+    
+    prefetcher.load(paths[4], lambda image, error: shown.append((4, image.size, None)))
+    assert shown[-1] == (4, (267, 200), None), "Prefetched images should be shown without waiting"
+    
+    prefetcher.load(paths[8], lambda image, error: shown.append((8, image, type(error).__name__)))
+    prefetcher.prefetch(paths, 8)
+    widget.pump(prefetcher)
+    print(f"   Cached around the last image: {[os.path.basename(path) for path in sorted(prefetcher.images)]}")
+    assert shown[-1] == (8, None, "UnidentifiedImageError"), "Decode errors should reach the callback"
+    assert paths[1] not in prefetcher.images, "Images outside the window should be released"
+    
+    prefetcher.load(paths[0], lambda image, error: shown.append("closed"))
+    prefetcher.close()
+    widget.pump(prefetcher, timeout=0.2)
+    assert shown[-1] != "closed", "Closing should drop outstanding work"
+    shutil.rmtree(directory)
+
+def test_photo_cache():
+    print("Testing bounded photo cache...")
+    from gui.photo_cache import PhotoCache
+    
+    class FakePhoto:
+        def __init__(self, width, height):
+            self.size = (width, height)
+        
+        def width(self):
+            return self.size[0]
+        
+        def height(self):
+            return self.size[1]
+    
+    photos = PhotoCache(max_bytes=3 * 760 * 400 * 4)
+    size = (760, 400)
+    for i in range(60):
+        photos.put(f"photo{i}.jpg", size, FakePhoto(760, 400))
+        photos.get("photo0.jpg", size)
+    
+    stats = photos.stats()
+    print(f"   Stats: {stats}")
+    assert stats['photos'] == 3 and stats['bytes'] <= stats['max_bytes'], "Photos should stay within the byte budget"
+    assert stats['evictions'] == 57, "Older photos should be evicted"
+    assert photos.get("photo0.jpg", size) is not None, "Recently viewed photos should survive eviction"
+    assert photos.get("photo1.jpg", size) is None, "Least recently used photos should be evicted"
+    assert photos.get("photo59.jpg", (860, 350)) is None, "Photos should be keyed by target size"
+    
+    photos.put("photo59.jpg", size, FakePhoto(380, 200))
+    assert photos.stats()['bytes'] == 2 * 760 * 400 * 4 + 380 * 200 * 4, "Replacing a photo should update its weight"
+    photos.put("huge.jpg", size, FakePhoto(4000, 3000))
+    assert photos.get("huge.jpg", size) is None and photos.stats()['photos'] == 3, "Oversized photos should be skipped"
+    
+    photos.put("photo0.jpg", size, FakePhoto(760, 400))
+    photos.clear()
+    assert photos.stats()['bytes'] == 0 and photos.get("photo0.jpg", size) is None, "Clearing should drop every photo"
+
+def test_image_ingest():
+    print("Testing parallel image ingestion...")
+    import shutil
+    import tempfile
+    from PIL import Image
+    from image_ingest import ImageIngestor
+    from image_store import ImageStore
+    from thumbnails import ThumbnailCache
+    
+    directory = tempfile.mkdtemp()
+    sources = []
+    for i in range(4):
+        sources.append(os.path.join(directory, f"phone{i}.jpg"))
+        photo = Image.new("RGB", (4000, 3000), (i * 60, 120, 40))
+        exif = photo.getexif()
+        exif[0x0112] = 6
+        photo.save(sources[-1], exif=exif, quality=95)
+    sources.append(os.path.join(directory, "small.jpg"))
+    Image.new("RGB", (640, 480), (1, 2, 3)).save(sources[-1])
+    sources.append(os.path.join(directory, "logo.png"))
+    Image.new("RGBA", (300, 300), (0, 0, 0, 0)).save(sources[-1])
+    sources.append(os.path.join(directory, "scan.bmp"))
+    Image.new("RGB", (1000, 800), (9, 9, 9)).save(sources[-1])
+    
+    thumbnails = ThumbnailCache(os.path.join(directory, ".thumbs"))
+    store = ImageStore(os.path.join(directory, "store"))
+    ingestor = ImageIngestor(store, thumbnails, max_edge=1600, workers=2)
+    
+    start = time.perf_counter()
+    futures = ingestor.submit(sources, [(760, 400)])
+    results = [future.result() for future in futures]
+    stored = [path for path, _ in results]
+    elapsed = time.perf_counter() - start
+    before = sum(os.path.getsize(path) for path in sources)
+    after = sum(os.path.getsize(path) for path in stored)
+    print(f"   {len(stored)} images in {elapsed * 1000:.0f} ms, {before // 1024} KB -> {after // 1024} KB")
+    
+    stored_files = lambda: [name for _, _, names in os.walk(store.root) for name in names]
+    assert all(store.contains(path) for path in stored), "Images should be written to the store"
+    assert all(created for _, created in results), "New images should be reported as created"
+    assert len(set(stored)) == len(stored), "Every image should get its own file"
+    assert Image.open(stored[0]).size == (1200, 1600), "Photos should be rotated upright and downscaled"
+    assert open(stored[4], "rb").read() == open(sources[4], "rb").read(), "Small JPEGs should be kept as they are"
+    assert stored[5].endswith(".png") and Image.open(stored[5]).mode == "RGBA", "Transparency should be preserved"
+    assert stored[6].endswith(".jpg") and after < before / 4, "Other images should be re-encoded more compactly"
+    assert not [name for name in stored_files() if name.endswith(".tmp")], "No temporary files should be left"
+    
+    thumbnails.get(stored[0], (760, 400))
+    thumbnails.get(stored[4], (760, 400))
+    assert thumbnails.stats()['hits'] == 2, "Thumbnails should be generated during ingestion, even for unchanged images"
+    
+    again = ingestor.submit(sources[:2], [(760, 400)])
+    assert [future.result() for future in again] == [(path, False) for path in stored[:2]], "Re-ingesting should reuse stored files"
+    ingestor.discard(again)
+    assert len(stored_files()) == len(stored), "Discarding reused files should keep them"
+    
+    ingestor.discard(futures)
+    assert not stored_files(), "Discarding should remove ingested files"
+    
+    try:
+        ImageIngestor(store, image_format="TIFF")
+        assert False, "Unsupported formats should be rejected"
+    except ValueError:
+        pass
+    
+    ingestor.close()
+    shutil.rmtree(directory)
+
+def test_image_store():
+    print("Testing content-addressed image store...")
+    import shutil
+    import tempfile
+    from PIL import Image
+    from image_store import ImageStore
+    
+    directory = tempfile.mkdtemp()
+    db_path = os.path.join(directory, "store.db")
+    db = InventoryDatabase(db_path)
+    store = ImageStore(os.path.join(directory, "store"))
+    
+    legacy_dir = os.path.join(directory, "materials")
+    os.makedirs(legacy_dir)
+    legacy = []
+    for i, content in enumerate([b"front", b"front", b"back", b"front"]):
+        legacy.append(os.path.join(legacy_dir, f"legacy{i}.JPG"))
+        with open(legacy[-1], "wb") as f:
+            f.write(content)
+    
+    photo = os.path.join(legacy_dir, "photo.jpeg")
+    Image.new("RGB", (8, 8), (200, 10, 10)).save(photo, "JPEG")
+    copies = [photo]
+    for name in ("photo.JPG", "photo.dat"):
+        copies.append(os.path.join(legacy_dir, name))
+        shutil.copy(photo, copies[-1])
+    copies.append(os.path.join(legacy_dir, "notes.jpeg"))
+    with open(copies[-1], "wb") as f:
+        f.write(b"notes")
+    copies.append(os.path.join(legacy_dir, "notes.jpg"))
+    shutil.copy(copies[-2], copies[-1])
+    outside = os.path.join(directory, "elsewhere.jpg")
+    shutil.copy(photo, outside)
+    
+    first = db.add_material("Oak offcut")
+    second = db.add_material("Pine offcut")
+    project = db.add_project("Shelf")
+    frame = db.add_project("Frame")
+    db.add_material_image(first, legacy[0])
+    db.add_material_image(first, legacy[1], is_primary=True)
+    db.add_material_image(first, legacy[2])
+    db.add_material_image(second, legacy[3], is_primary=True)
+    db.add_project_image(project, legacy[1])
+    db.add_project_image(project, os.path.join(legacy_dir, "missing.jpg"))
+    db.add_project_images(frame, copies + [outside])
+    
+    stats = store.migrate(db, [legacy_dir])
+    print(f"   Migrated {stats['files']} files into {stats['unique']} stored images")
+    assert stats == {'files': 9, 'unique': 4}, "Identical files should collapse into one stored image"
+    assert not any(os.path.exists(path) for path in legacy + copies), "Migrated files should be removed from their old location"
+    assert os.path.exists(outside), "Files outside the legacy directories should be left alone"
+    
+    images = db.get_material_images(first)
+    assert len(images) == 2, "Duplicate rows for one material should collapse"
+    assert images[0]['is_primary'] == 1, "The primary image should survive deduplication"
+    front = images[0]['image_path']
+    assert front == db.get_material_images(second)[0]['image_path'] == db.get_project_images(project)[0]['image_path']
+    assert os.path.relpath(front, store.root).split(os.sep)[:2] == [os.path.basename(front)[:2], os.path.basename(front)[2:4]], \
+        "Stored files should be sharded by hash prefix"
+    assert front.endswith(".jpg") and store.contains(front), "Stored files should keep a normalized extension"
+    stored = [image['image_path'] for image in db.get_project_images(frame)]
+    assert len(stored) == 3 and stored[-1] == outside, "Identical files should collapse whatever their extension"
+    assert all(path.endswith(".jpg") for path in stored), "Extensions should be canonical"
+    
+    late = os.path.join(legacy_dir, "late.jpg")
+    with open(late, "wb") as f:
+        f.write(b"late")
+    db.add_project_image(frame, late)
+    assert store.migrate(db, [legacy_dir]) == {'files': 0, 'unique': 0}, "The migration should only run once"
+    assert os.path.exists(late), "Later runs should not scan image paths again"
+    
+    assert db.count_image_references(front) == 3, "References should be counted across both image tables"
+    images = db.get_material_images(first)
+    db.delete_material(first)
+    assert store.release(db, [image['image_path'] for image in images]) == 1, "Unreferenced images should be released"
+    assert os.path.exists(front), "Shared images should be kept while still referenced"
+    
+    db.delete_material(second)
+    db.delete_project(project)
+    assert store.release(db, [front]) == 1 and not os.path.exists(front), "The last release should remove the file"
+    assert store.release(db, [outside]) == 0, "Files outside the store should never be released"
+    
+    db.close()
+    shutil.rmtree(directory)
+
+def test_batched_images():
+    print("Testing batched image inserts...")
+    
+    test_db_path = "test_batched_images.db"
+    if os.path.exists(test_db_path):
+        os.remove(test_db_path)
+    
+    db = InventoryDatabase(test_db_path)
+    material_id = db.add_material("Felt")
+    project_id = db.add_project("Coasters")
+    db.add_material_image(material_id, "front.jpg", is_primary=True)
+    
+    statements = []
+    db.conn.set_trace_callback(statements.append)
+    paths = ["front.jpg"] + [f"photo{i}.jpg" for i in range(200)] + ["photo0.jpg"]
+    ids = db.add_material_images(material_id, paths, primary_index=1)
+    db.conn.set_trace_callback(None)
+    
+    selects = [statement for statement in statements if statement.lstrip().upper().startswith("SELECT")]
+    print(f"   Added {len(ids)} images with {len(statements)} statements")
+    assert len(ids) == 200 and len(set(ids)) == 200, "Only new, distinct images should be inserted"
+    assert len(selects) == 1, "Existing images should be read once"
+    
+    images = db.get_material_images(material_id)
+    assert len(images) == 201, "Every image should be stored once"
+    assert [image['image_path'] for image in images if image['is_primary']] == ["photo0.jpg"], \
+        "The requested image should become the only primary image"
+    assert db.add_material_images(material_id, paths, primary_index=0) == [], "Re-adding existing images should be a no-op"
+    assert images[0]['id'] != db.get_material_images(material_id)[0]['id'], "An existing image can be made primary"
+    assert db.add_material_images(material_id, []) == [], "An empty batch should do nothing"
+    
+    ids = db.add_project_images(project_id, ["a.jpg", "b.jpg", "a.jpg"])
+    assert len(ids) == 2 and db.add_project_images(project_id, ["b.jpg", "c.jpg"]) == [ids[1] + 1], \
+        "Project images should be diffed against existing ones"
+    assert [image['image_path'] for image in db.get_project_images(project_id)] == ["a.jpg", "b.jpg", "c.jpg"]
+    
+    db.close()
+    os.remove(test_db_path)
+
+def test_project_material_diff():
+    print("Testing diff-based project material updates...")
+    
+    test_db_path = "test_project_material_diff.db"
+    if os.path.exists(test_db_path):
+        os.remove(test_db_path)
+    
+    db = InventoryDatabase(test_db_path)
+    project_id = db.add_project("Lamp")
+    ids = [db.add_material(f"Scrap {i}") for i in range(5)]
+    
+    assert db.set_project_materials(project_id, [(ids[0], 1), (ids[1], 2), (ids[2], 3)]) == \
+        {'inserted': 3, 'updated': 0, 'deleted': 0}, "New materials should be inserted"
+    rows = {row['material_id']: row['id'] for row in db.get_project_materials(project_id)}
+    version = db.change_version()
+    
+    statements = []
+    db.conn.set_trace_callback(statements.append)
+    changes = db.set_project_materials(project_id, [(ids[0], 1), (ids[1], 5), (ids[3], 1)])
+    db.conn.set_trace_callback(None)
+    print(f"   Changes: {changes}, {len(db.changes_since(version))} rows logged")
+    assert changes == {'inserted': 1, 'updated': 1, 'deleted': 1}, "Only changed rows should be written"
+    assert len(db.changes_since(version)) == 3, "Unchanged rows should not be touched"
+    
+    current = {row['material_id']: row for row in db.get_project_materials(project_id)}
+    assert sorted(current) == [ids[0], ids[1], ids[3]], "Removed materials should be deleted"
+    assert current[ids[1]]['quantity_used'] == 5, "Quantities should be updated"
+    assert current[ids[0]]['id'] == rows[ids[0]] and current[ids[1]]['id'] == rows[ids[1]], "Row ids should stay stable"
+    assert db.set_project_materials(project_id, [(ids[0], 1), (ids[1], 5), (ids[3], 1)]) == \
+        {'inserted': 0, 'updated': 0, 'deleted': 0}, "Saving without changes should write nothing"
+    
+    other_project = db.add_project("Tray")
+    assert db.set_project_materials(other_project, [(ids[0], 2), (ids[1], 1), (ids[0], 3), (ids[1], None)]) == \
+        {'inserted': 2, 'updated': 0, 'deleted': 0}, "Repeated materials should be stored once"
+    assert {row['material_id']: row['quantity_used'] for row in db.get_project_materials(other_project)} == \
+        {ids[0]: 5, ids[1]: 2}, "Repeated quantities should be added together, as the migration does"
+    
+    try:
+        db.add_project_material(project_id, ids[0], 2)
+        assert False, "A material should only be linked to a project once"
+    except sqlite3.IntegrityError:
+        pass
+    
+    db.conn.execute("DROP INDEX idx_project_materials_project")
+    db.conn.execute("CREATE INDEX idx_project_materials_project ON project_materials (project_id, material_id)")
+    db.add_project_material(project_id, ids[0], 2)
+    db.add_project_material(project_id, ids[4], 1)
+    db.conn.execute("PRAGMA user_version = 7")
+    db.conn.commit()
+    db.close()
+    
+    db = InventoryDatabase(test_db_path)
+    current = {row['material_id']: row for row in db.get_project_materials(project_id)}
+    assert len(db.get_project_materials(project_id)) == 4, "Duplicate links should be collapsed"
+    assert current[ids[0]]['id'] == rows[ids[0]] and current[ids[0]]['quantity_used'] == 3, \
+        "Duplicate quantities should be merged into the original row"
+    
+    db.close()
+    os.remove(test_db_path)
+
+def test_project_paging_with_null_dates():
+    print("Testing project paging with missing creation dates...")
+    
+    test_db_path = "test_project_paging.db"
+    if os.path.exists(test_db_path):
+        os.remove(test_db_path)
+    
+    db = InventoryDatabase(test_db_path)
+    ids = [db.add_project(f"Project {i}") for i in range(5)]
+    db.conn.execute("UPDATE projects SET created_at = NULL WHERE id IN (?, ?)", (ids[1], ids[3]))
+    db.conn.commit()
+    
+    paged = [project['id'] for project in db.iter_projects(page_size=2)]
+    print(f"   Paged order: {paged}")
+    assert sorted(paged) == sorted(ids), "Projects without a creation date should not end the walk"
+    assert paged[-2:] == [ids[3], ids[1]], "Projects without a creation date should sort last"
+    assert [project['id'] for project in db.get_project_summaries()] == paged, "Summaries should use the same order"
+    
+    db.close()
+    os.remove(test_db_path)
+
+def test_fulltext_paging():
+    print("Testing keyset paging over text searches...")
+    
+    test_db_path = "test_fulltext_paging.db"
+    if os.path.exists(test_db_path):
+        os.remove(test_db_path)
+    
+    db = InventoryDatabase(test_db_path)
+    db.add_materials_bulk([{'name': f"{'Oak' if i % 3 else 'Pine'} board {i}", 'brand': "Acme" if i % 2 else "Other",
+                            'width': i, 'height': 10} for i in range(300)])
+    
+    for fts_enabled in (db.fts_enabled, False):
+        db.fts_enabled = fts_enabled
+        text = {'name': "oak", 'brand': "acm"}
+        filters = dict(db.fulltext_filters(**text), min_width=50, max_width=250, unit="cm")
+        expected = [m['id'] for m in db.search_materials_fulltext(order_by='area', descending=True, **text,
+                                                                 min_width=50, max_width=250, unit="cm")]
+        
+        total, anchors = db.get_material_page_anchors(filters, 'area', True, page_size=10)
+        paged = [m['id'] for m in db.iter_materials(filters, 'area', True, page_size=10)]
+        print(f"   {'FTS' if fts_enabled else 'LIKE'}: {total} matches in {len(anchors)} full pages")
+        assert total == len(expected) == len(paged) and paged == expected, "Pages should match the full search"
+        assert db.get_materials_page(filters, 'area', True, page_size=10, after=anchors[0])[0][0]['id'] == paged[10], \
+            "Anchors should resume the search at the right row"
+    
+    assert db.fulltext_filters() == {}, "An empty search should not filter"
+    db.close()
+    os.remove(test_db_path)
+
 if __name__ == "__main__":
     try:
         test_database()
+        test_migrations()
+        test_query_plans()
+        test_bulk_insert()
+        test_transactions()
+        test_fulltext_search()
+        test_dimension_index()
+        test_unit_normalization()
+        test_keyset_pagination()
+        test_materials_with_box()
+        test_summaries()
+        test_record_rows()
+        test_connection_pool()
+        test_entity_cache()
+        test_change_tracking()
+        test_async_database()
+        test_page_anchors()
+        test_column_sorting()
+        test_search_cache()
+        test_thumbnail_cache()
+        test_image_prefetcher()
+        test_photo_cache()
+        test_image_ingest()
+        test_image_store()
+        test_batched_images()
+        test_project_material_diff()
+        test_project_paging_with_null_dates()
+        test_fulltext_paging()
     except Exception as e:
         print(f"\nTest failed with error: {e}")
         import traceback
@@ -0,0 +1,158 @@
+import hashlib
+import os
+import tempfile
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+from PIL import Image
+
+THUMBNAIL_DIR = os.path.join("images", ".thumbs")
+
+THUMBNAIL_SIZES = {
+    'material': (760, 400),
+    'project': (860, 350),
+}
+
+THUMBNAIL_CACHE_BYTES = 200 * 1024 * 1024
+
+JPEG_QUALITY = 85
+
+class ThumbnailCache:
+    def __init__(self, directory: str = THUMBNAIL_DIR, max_bytes: int = THUMBNAIL_CACHE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._total_bytes = None
+        self._lock = threading.Lock()
+    
+    def key(self, image_path: str, size: Tuple[int, int]) -> Optional[str]:
+        try:
+            stat = os.stat(image_path)
+        except OSError:
+            return None
+        source = f"{os.path.abspath(image_path)}|{stat.st_mtime_ns}|{stat.st_size}|{size[0]}x{size[1]}"
+        return hashlib.sha1(source.encode("utf-8")).hexdigest()
+    
+    def cached_path(self, key: str) -> Optional[str]:
+        for extension in (".jpg", ".png"):
+            path = os.path.join(self.directory, key[:2], key + extension)
+            if os.path.exists(path):
+                return path
+        return None
+    
+    def get(self, image_path: str, size: Tuple[int, int]) -> Image.Image:
+        key = self.key(image_path, size)
+        if key is None:
+            raise FileNotFoundError(image_path)
+        
+        path = self.cached_path(key)
+        if path is not None:
+            try:
+                image = Image.open(path)
+                image.load()
+                os.utime(path)
+                self.hits += 1
+                return image
+            except OSError:
+                pass
+        
+        self.misses += 1
+        return self.generate(image_path, [size])[0]
+    
+    def generate(self, image_path: str, sizes: Iterable[Tuple[int, int]] = THUMBNAIL_SIZES.values()) -> List[Image.Image]:
+        sizes = list(sizes)
+        largest = (max(width for width, _ in sizes), max(height for _, height in sizes))
+        with Image.open(image_path) as original:
+            original.draft("RGB", largest)
+            original.load()
+            thumbnails = []
+            for size in sizes:
+                thumbnail = original.copy()
+                thumbnail.thumbnail(size, Image.Resampling.LANCZOS)
+                key = self.key(image_path, size)
+                if key is not None:
+                    self.store(key, thumbnail)
+                thumbnails.append(thumbnail)
+        return thumbnails
+    
+    def warm(self, image_path: str, sizes: Iterable[Tuple[int, int]] = THUMBNAIL_SIZES.values()) -> bool:
+        missing = []
+        for size in sizes:
+            key = self.key(image_path, size)
+            if key is None or self.cached_path(key) is None:
+                missing.append(size)
+        if not missing:
+            return True
+        try:
+            self.generate(image_path, missing)
+        except OSError:
+            return False
+        return True
+    
+    def store(self, key: str, thumbnail: Image.Image):
+        directory = os.path.join(self.directory, key[:2])
+        os.makedirs(directory, exist_ok=True)
+        
+        has_alpha = thumbnail.mode in ("RGBA", "LA") or "transparency" in thumbnail.info
+        extension, image_format = (".png", "PNG") if has_alpha else (".jpg", "JPEG")
+        descriptor, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "wb") as output:
+                if has_alpha:
+                    thumbnail.save(output, image_format)
+                else:
+                    thumbnail.convert("RGB").save(output, image_format, quality=JPEG_QUALITY)
+            path = os.path.join(directory, key + extension)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        
+        with self._lock:
+            if self._total_bytes is not None:
+                self._total_bytes += os.path.getsize(path)
+        self.evict()
+    
+    def scan(self) -> List[Tuple[float, int, str]]:
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+    
+    def evict(self):
+        with self._lock:
+            if self._total_bytes is not None and self._total_bytes <= self.max_bytes:
+                return
+            entries = self.scan()
+            self._total_bytes = sum(size for _, size, _ in entries)
+            if self._total_bytes <= self.max_bytes:
+                return
+            
+            for _, size, path in sorted(entries):
+                if self._total_bytes <= self.max_bytes * 0.9:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                self._total_bytes -= size
+    
+    def clear(self):
+        with self._lock:
+            for _, _, path in self.scan():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._total_bytes = 0
+    
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'bytes': self._total_bytes or 0, 'max_bytes': self.max_bytes}